@@ -5,6 +5,7 @@ from core.config import settings
 import httpx
 from fastapi import HTTPException
 from pydantic import BaseModel, Field
+from services.http_client import http_client
 
 class CreateBidRequest(BaseModel):
     direction_id: str = Field(..., description="Direction ID from get_directions")
@@ -35,18 +36,18 @@ class WirebitAPI:
     async def get_directions(self) -> List[Dict[str, Any]]:
         """Get available exchange directions"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{self.base_url}get_directions",
-                    headers=self._get_headers()
-                )
-                response.raise_for_status()
-                result = response.json()
-                
-                if result.get("error") == 0:
-                    return result.get("data", [])
-                else:
-                    raise Exception(f"Failed to get directions: {result.get('error_text', 'Unknown error')}")
+            response = await http_client.client.get(
+                f"{self.base_url}get_directions",
+                headers=self._get_headers(),
+                timeout=30.0
+            )
+            response.raise_for_status()
+            result = response.json()
+            
+            if result.get("error") == 0:
+                return result.get("data", [])
+            else:
+                raise Exception(f"Failed to get directions: {result.get('error_text', 'Unknown error')}")
         except httpx.RequestError as e:
             raise Exception(f"Network error: {str(e)}")
 
@@ -111,63 +112,62 @@ class WirebitAPI:
             "cf6": create_bid_data.cf6 or "test@example.com"
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{self.base_url}create_bid",
-                headers=headers,
-                data=data  # Using data instead of json for form encoding
-            )
-            
-            result = response.json()
+        response = await http_client.client.post(
+            f"{self.base_url}create_bid",
+            headers=headers,
+            data=data,  # Using data instead of json for form encoding
+            timeout=30.0
+        )
+        
+        result = response.json()
+        
+        if result.get("error") != "0" and result.get("error") != 0:
+            error_text = result.get('error_text', 'Unknown error')
+            error_fields = result.get('error_fields', {})
             
-            if result.get("error") != "0" and result.get("error") != 0:
-                error_text = result.get('error_text', 'Unknown error')
-                error_fields = result.get('error_fields', {})
-                
-                # Parse error fields for more details
-                if error_fields:
-                    details = []
-                    for field, error_html in error_fields.items():
-                        # Try to extract min/max values from HTML
-                        import re
-                        min_match = re.search(r'min[.:]\s*([0-9.]+)', str(error_html))
-                        max_match = re.search(r'max[.:]\s*([0-9.]+)', str(error_html))
-                        
-                        if min_match or max_match:
-                            limits = []
-                            if min_match:
-                                limits.append(f"min: {min_match.group(1)}")
-                            if max_match:
-                                limits.append(f"max: {max_match.group(1)}")
-                            details.append(f"{field}: {', '.join(limits)}")
+            # Parse error fields for more details
+            if error_fields:
+                details = []
+                for field, error_html in error_fields.items():
+                    # Try to extract min/max values from HTML
+                    min_match = re.search(r'min[.:]\s*([0-9.]+)', str(error_html))
+                    max_match = re.search(r'max[.:]\s*([0-9.]+)', str(error_html))
                     
-                    if details:
-                        error_text += f" ({'; '.join(details)})"
+                    if min_match or max_match:
+                        limits = []
+                        if min_match:
+                            limits.append(f"min: {min_match.group(1)}")
+                        if max_match:
+                            limits.append(f"max: {max_match.group(1)}")
+                        details.append(f"{field}: {', '.join(limits)}")
                 
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"API error: {error_text}"
-                )
+                if details:
+                    error_text += f" ({'; '.join(details)})"
             
-            return result.get("data", result)
+            raise HTTPException(
+                status_code=400,
+                detail=f"API error: {error_text}"
+            )
+        
+        return result.get("data", result)
 
     async def check_status(self, bid_id: str) -> Dict[str, Any]:
         """Check the status of an exchange bid"""
         try:
             data = {"bid_id": bid_id}
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}get_status",
-                    headers=self._get_headers("application/x-www-form-urlencoded"),
-                    data=data
-                )
-                response.raise_for_status()
-                result = response.json()
-                
-                if result.get("error") == 0:
-                    return result.get("data", {})
-                else:
-                    raise Exception(f"Failed to check status: {result.get('error_text', 'Unknown error')}")
+            response = await http_client.client.post(
+                f"{self.base_url}get_status",
+                headers=self._get_headers("application/x-www-form-urlencoded"),
+                data=data,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            result = response.json()
+            
+            if result.get("error") == 0:
+                return result.get("data", {})
+            else:
+                raise Exception(f"Failed to check status: {result.get('error_text', 'Unknown error')}")
         except httpx.RequestError as e:
             raise Exception(f"Network error: {str(e)}")
 
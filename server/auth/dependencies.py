@@ -1,48 +1,57 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from typing import Optional
-from jose import jwt, JWTError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, Optional
 
-from database import SessionLocal
+from database import AsyncSessionLocal
 from models.models import User
-from auth.auth_utils import SECRET_KEY, ALGORITHM
+from auth.user_cache import auth_cache
 
 security = HTTPBearer(auto_error=False)
 
 
-def get_db():
+async def get_db() -> AsyncIterator[AsyncSession]:
     """Get database session"""
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def get_current_user_optional(
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
+    """Load a user by username"""
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
+
+
+async def resolve_user(db: AsyncSession, username: str) -> Optional[User]:
+    """Load the authenticated user, from the cache when possible"""
+    user = await auth_cache.get_user(db, username)
+    if user is None:
+        user = await get_user_by_username(db, username)
+        if user is not None:
+            auth_cache.remember(user)
+    return user
+
+
+async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Optional[User]:
     """Get current user, returns None if not authenticated"""
     if not credentials:
         return None
     
-    try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-    except JWTError:
+    username = auth_cache.username_for(credentials.credentials)
+    if username is None:
         return None
     
-    user = db.query(User).filter(User.username == username).first()
+    user = await resolve_user(db, username)
     return user
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
     """Get current user, raises exception if not authenticated"""
     if not credentials:
@@ -52,23 +61,15 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-    except JWTError:
+    username = auth_cache.username_for(credentials.credentials)
+    if username is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.username == username).first()
+    user = await resolve_user(db, username)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, TypeVar
+
+from core.config import settings
+from auth.auth_utils import pwd_context
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class HasherBusyError(Exception):
+    """Raised when too many hash operations are already queued"""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated thread pool instead of the event loop.
+    
+    bcrypt releases the GIL while hashing, so a few threads keep all cores
+    busy without stalling other requests. At most `max_pending` operations
+    may be running or queued; beyond that callers get HasherBusyError
+    straight away rather than piling up behind a login burst.
+    """
+    
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._pending = 0
+    
+    @property
+    def pending(self) -> int:
+        return self._pending
+    
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        if self._pending >= self.max_pending:
+            raise HasherBusyError(f"{self._pending} password hash operations pending")
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+    
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+    
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Check a password; also returns a new hash when the stored one uses an outdated work factor"""
+        return await self._run(pwd_context.verify_and_update, password, hashed_password)
+    
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instance
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending
+)
@@ -0,0 +1,77 @@
+import time
+from typing import Optional
+
+from jose import jwt, JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from core.cache import TTLCache
+from core.config import settings
+from models.models import User
+from auth.auth_utils import SECRET_KEY, ALGORITHM
+
+
+class AuthCache:
+    """Caches decoded tokens and resolved users for the auth dependencies.
+    
+    Tokens map to their subject until the configured TTL or the token's own
+    expiry, whichever comes first. Users are kept as detached snapshots and
+    merged into the request session without a SELECT. Routes that change a
+    user's verification state or active flag call `invalidate`; the short
+    user TTL bounds staleness across worker processes.
+    """
+    
+    def __init__(self, maxsize: int, token_ttl: float, user_ttl: float):
+        self._tokens = TTLCache(maxsize, token_ttl)
+        self._users = TTLCache(maxsize, user_ttl)
+        self.token_ttl = token_ttl
+    
+    def username_for(self, token: str) -> Optional[str]:
+        """Subject of a valid token, or None"""
+        username = self._tokens.get(token)
+        if username is not None:
+            return username
+        
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return None
+        username = payload.get("sub")
+        if username is None:
+            return None
+        
+        ttl = self.token_ttl
+        if payload.get("exp") is not None:
+            ttl = min(ttl, payload["exp"] - time.time())
+        if ttl > 0:
+            self._tokens.set(token, username, ttl=ttl)
+        return username
+    
+    async def get_user(self, db: AsyncSession, username: str) -> Optional[User]:
+        """Cached user attached to `db`, or None when not cached"""
+        snapshot = self._users.get(username)
+        if snapshot is None:
+            return None
+        # load=False copies the snapshot into the session without querying
+        return await db.merge(snapshot, load=False)
+    
+    def remember(self, user: User):
+        columns = {attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs}
+        snapshot = User(**columns)
+        make_transient_to_detached(snapshot)
+        self._users.set(user.username, snapshot)
+    
+    def invalidate(self, username: str):
+        self._users.pop(username)
+    
+    def clear(self):
+        self._tokens.clear()
+        self._users.clear()
+
+
+# Singleton instance
+auth_cache = AuthCache(
+    settings.auth_cache_size,
+    token_ttl=settings.auth_token_cache_ttl,
+    user_ttl=settings.auth_user_cache_ttl
+)
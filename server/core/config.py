@@ -10,6 +10,108 @@ class Settings(BaseSettings):
     wirebit_base_url: str = Field(default="https://wirebit.net/api/userapi/v1/")
     cors_origins: List[str] = Field(default=["http://localhost:3000", "http://localhost:5173", "http://localhost:5174"])
     log_level: str = Field(default="INFO")
+    log_format: str = Field(default="json")  # "text" for the plain line format
+    log_queue_size: int = Field(default=10000)  # records waiting for the writer thread; more are dropped
+    log_max_message_chars: int = Field(default=4000)
+    log_payload_max_chars: int = Field(default=2000)  # per structured field
+    log_payload_max_items: int = Field(default=20)  # list/dict entries kept per level
+    log_payload_sample_rate: float = Field(default=0.01)  # share of upstream response bodies logged at DEBUG
+    log_redact_fields: List[str] = Field(default=[])  # masked in addition to core/log_config.py REDACTED_FIELDS
+    run_migrations_on_startup: bool = Field(default=True)  # disable when migrations run as a deploy step
+    rates_refresh_interval: float = Field(default=60.0)  # seconds between XML feed refreshes
+    rates_fetch_timeout: float = Field(default=15.0)
+    rates_cache_max_age: int = Field(default=30)  # Cache-Control max-age for /api/rates
+    
+    # Shared outbound HTTP client
+    http_timeout: float = Field(default=10.0)
+    http_connect_timeout: float = Field(default=5.0)
+    http_max_connections: int = Field(default=100)
+    http_max_keepalive_connections: int = Field(default=20)
+    http_keepalive_expiry: float = Field(default=30.0)
+    http2_enabled: bool = Field(default=True)
+    create_bid_timeout: float = Field(default=30.0)
+    
+    # Circuit breaker and retries for Wirebit API calls
+    wirebit_breaker_window: int = Field(default=50)  # outcomes kept for the failure rate
+    wirebit_breaker_min_calls: int = Field(default=10)
+    wirebit_breaker_failure_rate: float = Field(default=0.5)
+    wirebit_breaker_open_seconds: float = Field(default=30.0)
+    wirebit_breaker_half_open_probes: int = Field(default=3)
+    wirebit_max_retries: int = Field(default=2)  # idempotent calls only
+    wirebit_retry_budget_ratio: float = Field(default=0.2)  # retries per request
+    wirebit_retry_budget_max: float = Field(default=10.0)
+    wirebit_retry_backoff_base: float = Field(default=0.2)
+    wirebit_retry_backoff_cap: float = Field(default=2.0)
+    
+    # Adaptive (AIMD) limit on concurrent Wirebit API calls
+    wirebit_concurrency_initial: int = Field(default=20)
+    wirebit_concurrency_min: int = Field(default=2)
+    wirebit_concurrency_max: int = Field(default=200)
+    wirebit_latency_tolerance: float = Field(default=2.0)  # short vs long-window latency before backing off
+    wirebit_concurrency_backoff: float = Field(default=0.9)  # multiplicative decrease
+    wirebit_queue_timeout: float = Field(default=5.0)  # max wait for a slot
+    wirebit_max_queue: int = Field(default=500)
+    
+    # Per-bid status cache, terminal statuses are kept until evicted
+    status_cache_ttl: float = Field(default=5.0)  # seconds for in-flight statuses
+    status_cache_size: int = Field(default=10000)
+    
+    # Background bid status poller
+    status_poll_interval: float = Field(default=5.0)  # seconds between scheduling passes
+    status_poll_concurrency: int = Field(default=10)  # parallel upstream status calls
+    status_poll_batch_size: int = Field(default=100)  # bids checked per pass at most
+    status_poll_min_backoff: float = Field(default=10.0)  # delay for fresh bids
+    status_poll_max_backoff: float = Field(default=600.0)  # delay cap for old, idle bids
+    status_poll_max_age_days: int = Field(default=7)  # bids created earlier are no longer polled
+    status_poll_load_limit: int = Field(default=1000)  # least recently checked bids considered per pass
+    
+    # Server-sent bid status stream
+    status_stream_interval: float = Field(default=5.0)  # upstream check interval per watched bid
+    status_stream_heartbeat: float = Field(default=15.0)  # keep-alive comment interval
+    status_stream_max_bids: int = Field(default=20)  # bids per subscription
+    
+    # Authenticated-user cache (auth/user_cache.py)
+    auth_cache_size: int = Field(default=10000)
+    auth_token_cache_ttl: float = Field(default=300.0)  # decoded token -> username
+    auth_user_cache_ttl: float = Field(default=30.0)  # username -> user snapshot
+    
+    # Password hashing
+    bcrypt_rounds: int = Field(default=12)  # work factor; other hashes are upgraded on login
+    password_hash_workers: int = Field(default=4)  # threads running bcrypt
+    password_hash_max_pending: int = Field(default=64)  # running + queued before 429
+    
+    # Verification document storage (services/document_storage.py, services/document_compactor.py)
+    verification_upload_dir: str = Field(default="uploads/verification")
+    document_compaction_interval: float = Field(default=3600.0)  # seconds between compaction passes
+    document_orphan_grace: float = Field(default=3600.0)  # seconds before unreferenced files are removed
+    document_retention_days: int = Field(default=0)  # purge rejected requests' files after N days, 0 keeps them
+    document_recompress_after_days: int = Field(default=30)  # lossless PNG repack of settled uploads
+    
+    # Where stored documents live (services/blob_store.py): "local" keeps them under
+    # verification_upload_dir, "s3" in an S3-compatible bucket (needs boto3)
+    storage_backend: str = Field(default="local")
+    s3_bucket: str = Field(default="")
+    s3_prefix: str = Field(default="verification/")  # key prefix inside the bucket
+    s3_endpoint_url: str = Field(default="")  # e.g. http://minio:9000, empty for AWS
+    s3_region: str = Field(default="")
+    s3_access_key_id: str = Field(default="")  # empty uses the default AWS credential chain
+    s3_secret_access_key: str = Field(default="")
+    s3_addressing_style: str = Field(default="auto")  # "path" for MinIO
+    s3_max_connections: int = Field(default=20)
+    s3_presign_expiry: int = Field(default=300)  # seconds presigned admin URLs stay valid
+    document_cache_max_age: int = Field(default=300)  # Cache-Control max-age for admin document downloads
+    document_accel_redirect_prefix: str = Field(default="")  # e.g. /protected/ to let nginx send local files
+    
+    # Verification document processing (services/document_pipeline.py, needs Pillow)
+    document_workers: int = Field(default=2)  # worker processes
+    document_preview_size: int = Field(default=1600)  # longest side, px
+    document_thumbnail_size: int = Field(default=320)  # longest side, px
+    document_max_pixels: int = Field(default=100_000_000)  # decompression bomb guard
+    document_min_dimension: int = Field(default=200)  # shortest side, px
+    document_processing_timeout: float = Field(default=600.0)  # seconds before a claimed document is taken over
+    
+    # Admin dashboard counters
+    stats_reconcile_interval: float = Field(default=600.0)  # seconds between full recounts
     
     class Config:
         env_file = ".env"
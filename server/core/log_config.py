@@ -0,0 +1,222 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import re
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Iterable, Optional
+
+from core.config import settings
+
+
+# Field names whose values never reach the log, matched case-insensitively.
+# account*/cf* are Wirebit bid fields holding card numbers, wallets and names.
+REDACTED_FIELDS = frozenset({
+    "password", "hashed_password", "new_password", "token", "access_token", "refresh_token",
+    "authorization", "cookie", "api_key", "api_login", "secret", "secret_key",
+    "account1", "account2", "account_to", "cf1", "cf2", "cf3", "cf6", "cf10", "cf11",
+    "cfgive8", "cfget1", "cfget9", "email", "email_used", "wallet_address",
+})
+REDACTED = "***"
+
+# 13-19 digits, optionally grouped by spaces or dashes: card numbers in free text
+CARD_NUMBER = re.compile(r"\b\d(?:[ -]?\d){12,18}\b")
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def _mask_card(match: "re.Match") -> str:
+    digits = re.sub(r"\D", "", match.group())
+    return f"****{digits[-4:]}"
+
+
+def mask_text(text: str, max_chars: int) -> str:
+    text = CARD_NUMBER.sub(_mask_card, text)
+    if len(text) > max_chars:
+        text = f"{text[:max_chars]}... (+{len(text) - max_chars} chars)"
+    return text
+
+
+def redact(value: Any, fields: frozenset, max_items: int, depth: int = 0) -> Any:
+    """Copy of a payload with sensitive fields masked and long containers cut short"""
+    if depth > 6:
+        return "..."
+    if isinstance(value, dict):
+        result = {}
+        for index, (key, item) in enumerate(value.items()):
+            if index >= max_items:
+                result["..."] = f"+{len(value) - max_items} more"
+                break
+            if str(key).lower() in fields:
+                result[key] = REDACTED
+            else:
+                result[key] = redact(item, fields, max_items, depth + 1)
+        return result
+    if isinstance(value, (list, tuple)):
+        result = [redact(item, fields, max_items, depth + 1) for item in value[:max_items]]
+        if len(value) > max_items:
+            result.append(f"... +{len(value) - max_items} more")
+        return result
+    if isinstance(value, str):
+        return CARD_NUMBER.sub(_mask_card, value)
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line.
+    
+    Values passed with `extra` become fields of their own, redacted and
+    capped in size; the message itself has card numbers masked and is
+    truncated as well.
+    """
+    
+    def __init__(self, redacted_fields: Iterable[str], max_message_chars: int,
+                 max_field_chars: int, max_items: int):
+        super().__init__()
+        self.redacted_fields = frozenset(field.lower() for field in redacted_fields)
+        self.max_message_chars = max_message_chars
+        self.max_field_chars = max_field_chars
+        self.max_items = max_items
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": mask_text(record.getMessage(), self.max_message_chars),
+        }
+        for key, value in vars(record).items():
+            if key in _RECORD_ATTRS or key.startswith("_"):
+                continue
+            if key.lower() in self.redacted_fields:
+                entry[key] = REDACTED
+                continue
+            value = redact(value, self.redacted_fields, self.max_items)
+            encoded = json.dumps(value, ensure_ascii=False, default=str)
+            if len(encoded) > self.max_field_chars:
+                value = mask_text(encoded, self.max_field_chars)
+            entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The plain line format, with the same masking and message cap"""
+    
+    def __init__(self, max_message_chars: int):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        self.max_message_chars = max_message_chars
+    
+    def format(self, record: logging.LogRecord) -> str:
+        return mask_text(super().format(record), self.max_message_chars)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Hands records to the writer thread without ever blocking the caller.
+    
+    Formatting, redaction and the write to stdout all happen on the
+    listener thread. When the bounded queue is full the record is dropped
+    and counted instead of stalling the event loop.
+    """
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args now (they may change after this call) but leave
+        # formatting and `extra` payloads to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks keep frames alive; render them while they are valid
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _BlockingStopListener(QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room rather than fail on a full queue; everything queued
+        # before the sentinel is still written
+        self.queue.put(self._sentinel)
+
+
+class LogSampler:
+    """Lets through a fixed share of calls; for logging large payloads"""
+    
+    def __init__(self, rate: float):
+        self.rate = rate
+    
+    def __call__(self) -> bool:
+        return self.rate >= 1 or (self.rate > 0 and random.random() < self.rate)
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[DroppingQueueHandler] = None
+
+
+def setup_logging():
+    """Route all logging through a queue to a single writer thread.
+    
+    Replaces the root handlers and makes uvicorn's loggers propagate to the
+    root, so access logs take the same non-blocking path.
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return
+    
+    if settings.log_format == "text":
+        formatter: logging.Formatter = TextFormatter(settings.log_max_message_chars)
+    else:
+        formatter = JsonFormatter(
+            REDACTED_FIELDS | {field.lower() for field in settings.log_redact_fields},
+            max_message_chars=settings.log_max_message_chars,
+            max_field_chars=settings.log_payload_max_chars,
+            max_items=settings.log_payload_max_items
+        )
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+    
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.log_queue_size)
+    _handler = DroppingQueueHandler(log_queue)
+    _listener = _BlockingStopListener(log_queue, stream_handler, respect_handler_level=True)
+    
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    root.setLevel(getattr(logging, settings.log_level))
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+    
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Write out everything still queued and stop the writer thread"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    if _handler is not None and _handler.dropped:
+        sys.stderr.write(f"Dropped {_handler.dropped} log records: queue full\n")
@@ -0,0 +1,104 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+PREV_CURSOR_HEADER = "X-Prev-Cursor"
+
+
+class Cursor(NamedTuple):
+    created_at: datetime
+    id: int
+    backward: bool
+
+
+class KeysetPage(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+
+
+def encode_cursor(created_at: datetime, row_id: int, backward: bool = False) -> str:
+    """Opaque cursor pointing just past a (created_at, id) position"""
+    payload = {"t": created_at.isoformat(), "id": row_id, "b": backward}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        return Cursor(
+            created_at=datetime.fromisoformat(payload["t"]),
+            id=int(payload["id"]),
+            backward=bool(payload.get("b", False))
+        )
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+async def paginate_keyset(db: AsyncSession, query: Select, model: Any, limit: int,
+                          cursor: Optional[str] = None, skip: int = 0) -> KeysetPage:
+    """Page through `query` newest first using (created_at, id) as the key.
+    
+    With a cursor the page starts right after the cursor position, so the
+    cost does not depend on how deep the page is. Without one the legacy
+    offset (`skip`) is used; cursors are returned either way so clients can
+    switch over.
+    """
+    created_at, row_id = model.created_at, model.id
+    position = decode_cursor(cursor) if cursor else None
+    
+    if position is None:
+        query = query.order_by(created_at.desc(), row_id.desc()).offset(skip)
+    elif position.backward:
+        query = query.where(or_(
+            created_at > position.created_at,
+            and_(created_at == position.created_at, row_id > position.id)
+        )).order_by(created_at.asc(), row_id.asc())
+    else:
+        query = query.where(or_(
+            created_at < position.created_at,
+            and_(created_at == position.created_at, row_id < position.id)
+        )).order_by(created_at.desc(), row_id.desc())
+    
+    # One extra row tells whether there is anything beyond this page
+    result = await db.execute(query.limit(limit + 1))
+    items = list(result.scalars().unique().all())
+    has_more = len(items) > limit
+    items = items[:limit]
+    
+    if position is not None and position.backward:
+        items.reverse()
+        has_newer, has_older = has_more, True
+    else:
+        has_newer = position is not None or skip > 0
+        has_older = has_more
+    
+    next_cursor = prev_cursor = None
+    if items:
+        if has_older:
+            next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+        if has_newer:
+            prev_cursor = encode_cursor(items[0].created_at, items[0].id, backward=True)
+    
+    return KeysetPage(items=items, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+
+def set_cursor_headers(response: Response, page: KeysetPage):
+    """Expose the page cursors without changing the list response body"""
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    if page.prev_cursor:
+        response.headers[PREV_CURSOR_HEADER] = page.prev_cursor
@@ -0,0 +1,53 @@
+from typing import Dict
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+
+
+# Allowance for multipart boundaries, part headers and small form fields
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class RequestSizeLimitMiddleware:
+    """Rejects oversized request bodies on selected paths before they are buffered.
+    
+    A declared Content-Length over the limit is answered with 413 right away;
+    bodies without one are counted as they arrive and cut off with 413 as
+    soon as the limit is crossed.
+    """
+    
+    def __init__(self, app, limits: Dict[str, int], detail: str = "Request body too large"):
+        self.app = app
+        self.limits = limits
+        self.detail = detail
+    
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get("path")) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        
+        for name, value in scope.get("headers", []):
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                response = JSONResponse(
+                    {"detail": self.detail},
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                )
+                await response(scope, receive, send)
+                return
+        
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=self.detail
+                    )
+            return message
+        
+        await self.app(scope, limited_receive, send)
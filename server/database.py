@@ -1,22 +1,56 @@
 import os
-from databases import Database
 from sqlalchemy import create_engine, MetaData
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 # Database URL - for dev using SQLite, for prod can use PostgreSQL
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./wirebit.db")
 
+
+def get_async_url(url: str) -> str:
+    """Map a sync database URL to its async driver (aiosqlite / asyncpg)"""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
+ASYNC_DATABASE_URL = get_async_url(DATABASE_URL)
+
 # For SQLite
 if DATABASE_URL.startswith("sqlite"):
-    database = Database(DATABASE_URL)
     engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    async_engine = create_async_engine(ASYNC_DATABASE_URL)
 else:
     # For PostgreSQL
-    database = Database(DATABASE_URL)
     engine = create_engine(DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=True)
 
 metadata = MetaData()
 Base = declarative_base()
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) 
\ No newline at end of file
+# Sync sessions are only used by standalone scripts such as create_admin.py
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Request handlers and background workers use async sessions
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+
+def dialect_insert(db: AsyncSession):
+    """INSERT construct supporting ON CONFLICT for the session's database"""
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"Upserts are not supported on {dialect}")
@@ -3,32 +3,73 @@ import os
 # Add the server directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import logging
 
 from core.config import settings
+from core.log_config import setup_logging
+from core.pagination import NEXT_CURSOR_HEADER, PREV_CURSOR_HEADER
+from core.request_limits import RequestSizeLimitMiddleware, MULTIPART_OVERHEAD_BYTES
 from routes import exchange, auth, history, verification, admin
-from database import engine
-from models.models import Base
-
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, settings.log_level),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+from database import async_engine
+from migrations import upgrade_database
+from services.http_client import http_client
+from services.wirebit_client import wirebit_client
+from services.rate_refresher import rate_refresher
+from services.status_poller import bid_status_poller
+from services.status_broadcaster import status_broadcaster
+from services.admin_stats import stats_reconciler
+from auth.password_hasher import password_hasher
+from services.document_pipeline import document_pipeline
+from services.document_compactor import document_compactor
+
+# Configure logging: JSON lines written by a background thread
+setup_logging()
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background workers together with the app"""
+    # Bring the schema up to date (alembic upgrade head)
+    if settings.run_migrations_on_startup:
+        try:
+            await asyncio.to_thread(upgrade_database)
+            logger.info("Database migrations applied successfully")
+        except Exception as e:
+            logger.error(f"Error applying database migrations: {str(e)}")
+    
+    await http_client.start()
+    await rate_refresher.start()
+    await bid_status_poller.start()
+    await stats_reconciler.start()
+    await document_pipeline.start()
+    await document_compactor.start()
+    try:
+        yield
+    finally:
+        await document_compactor.stop()
+        await document_pipeline.stop()
+        await stats_reconciler.stop()
+        await status_broadcaster.stop()
+        await bid_status_poller.stop()
+        await rate_refresher.stop()
+        await http_client.close()
+        password_hasher.shutdown()
+        await async_engine.dispose()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Wirebit Exchange API",
     description="Backend API for cryptocurrency exchange integration with Wirebit",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -38,14 +79,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, PREV_CURSOR_HEADER],
 )
 
-# Create database tables
-try:
-    Base.metadata.create_all(bind=engine)
-    logger.info("Database tables created successfully")
-except Exception as e:
-    logger.error(f"Error creating database tables: {str(e)}")
+# Cut off oversized verification uploads before the multipart body is buffered
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    limits={"/api/verification/submit": verification.MAX_FILE_SIZE + MULTIPART_OVERHEAD_BYTES},
+    detail=verification.MAX_FILE_SIZE_DETAIL
+)
 
 # Include routers
 app.include_router(exchange.router)
@@ -80,7 +122,8 @@ async def root():
 async def health_check():
     return {
         "status": "healthy",
-        "service": "wirebit-exchange-api"
+        "service": "wirebit-exchange-api",
+        "upstream": wirebit_client.upstream_stats()
     }
 
 
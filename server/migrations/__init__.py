@@ -0,0 +1,16 @@
+# Migrations package
+import os
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def upgrade_database(revision: str = "head"):
+    """Apply Alembic migrations up to the given revision (blocking)"""
+    from alembic import command
+    from alembic.config import Config
+    
+    config = Config(os.path.join(SERVER_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(SERVER_DIR, "migrations"))
+    # Keep the application's logging setup instead of alembic.ini's
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, revision)
@@ -0,0 +1,49 @@
+from typing import List, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+def has_table(table_name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(table_name)
+
+
+def has_column(table_name: str, column_name: str) -> bool:
+    columns = sa.inspect(op.get_bind()).get_columns(table_name)
+    return any(column["name"] == column_name for column in columns)
+
+
+def has_index(table_name: str, index_name: str) -> bool:
+    indexes = sa.inspect(op.get_bind()).get_indexes(table_name)
+    return any(index["name"] == index_name for index in indexes)
+
+
+def is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def create_index_online(index_name: str, table_name: str, columns: List[Union[str, sa.sql.ClauseElement]],
+                        **kwargs):
+    """Create an index without blocking writes.
+    
+    PostgreSQL builds it CONCURRENTLY, which cannot run inside a transaction,
+    so the statement is issued in an autocommit block. Other databases get a
+    plain CREATE INDEX. Existing indexes are left alone.
+    """
+    if has_index(table_name, index_name):
+        return
+    if is_postgresql():
+        with op.get_context().autocommit_block():
+            op.create_index(index_name, table_name, columns, postgresql_concurrently=True, **kwargs)
+    else:
+        op.create_index(index_name, table_name, columns, **kwargs)
+
+
+def drop_index_online(index_name: str, table_name: str):
+    if not has_index(table_name, index_name):
+        return
+    if is_postgresql():
+        with op.get_context().autocommit_block():
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True)
+    else:
+        op.drop_index(index_name, table_name=table_name)
@@ -0,0 +1,89 @@
+"""Baseline schema (users, exchange_history, verification_requests)
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18
+
+Databases created earlier by Base.metadata.create_all already have these
+tables; they are skipped so such databases can be upgraded in place.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import has_table
+
+
+# revision identifiers, used by Alembic.
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("username", sa.String(), nullable=False),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column("is_verified", sa.Boolean(), nullable=True),
+            sa.Column("verification_status", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id")
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+    
+    if not has_table("exchange_history"):
+        op.create_table(
+            "exchange_history",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("direction_id", sa.String(), nullable=False),
+            sa.Column("from_currency", sa.String(), nullable=False),
+            sa.Column("to_currency", sa.String(), nullable=False),
+            sa.Column("amount_give", sa.Float(), nullable=False),
+            sa.Column("amount_get", sa.Float(), nullable=False),
+            sa.Column("exchange_rate", sa.Float(), nullable=False),
+            sa.Column("bid_id", sa.String(), nullable=True),
+            sa.Column("status", sa.String(), nullable=True),
+            sa.Column("payment_address", sa.String(), nullable=True),
+            sa.Column("wirebit_url", sa.String(), nullable=True),
+            sa.Column("wallet_address", sa.String(), nullable=True),
+            sa.Column("email_used", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.Column("additional_data", sa.Text(), nullable=True),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id")
+        )
+        op.create_index("ix_exchange_history_id", "exchange_history", ["id"])
+    
+    if not has_table("verification_requests"):
+        op.create_table(
+            "verification_requests",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("filename", sa.String(), nullable=False),
+            sa.Column("file_path", sa.String(), nullable=False),
+            sa.Column("file_size", sa.Integer(), nullable=False),
+            sa.Column("status", sa.String(), nullable=True),
+            sa.Column("admin_comment", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.Column("processed_by", sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(["processed_by"], ["users.id"]),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id")
+        )
+        op.create_index("ix_verification_requests_id", "verification_requests", ["id"])
+
+
+def downgrade():
+    op.drop_table("verification_requests")
+    op.drop_table("exchange_history")
+    op.drop_table("users")
@@ -0,0 +1,43 @@
+"""Composite indexes for history, admin and status poller queries
+
+Revision ID: 0002_hot_table_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-18
+
+Built CONCURRENTLY on PostgreSQL so they can be added to a live database.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision = "0002_hot_table_indexes"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    # GET /api/history: WHERE user_id = ? ORDER BY created_at DESC
+    ("ix_exchange_history_user_id_created_at", "exchange_history", ["user_id", sa.text("created_at DESC")]),
+    # GET /api/admin/exchanges: WHERE status = ? ORDER BY created_at DESC
+    ("ix_exchange_history_status_created_at", "exchange_history", ["status", sa.text("created_at DESC")]),
+    # Bid lookups by Wirebit id
+    ("ix_exchange_history_bid_id", "exchange_history", ["bid_id"]),
+    # Pending / approved checks per user
+    ("ix_verification_requests_user_id_status", "verification_requests", ["user_id", "status"]),
+    # Admin verification queue: WHERE status = 'pending' ORDER BY created_at DESC
+    ("ix_verification_requests_status_created_at", "verification_requests", ["status", sa.text("created_at DESC")]),
+]
+
+
+def upgrade():
+    for index_name, table_name, columns in INDEXES:
+        create_index_online(index_name, table_name, columns)
+
+
+def downgrade():
+    for index_name, table_name, _ in reversed(INDEXES):
+        drop_index_online(index_name, table_name)
@@ -0,0 +1,31 @@
+"""Index for keyset pagination over all exchanges
+
+Revision ID: 0003_exchange_history_keyset
+Revises: 0002_hot_table_indexes
+Create Date: 2026-10-18
+
+The unfiltered admin exchange listing pages by (created_at, id) newest first.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision = "0003_exchange_history_keyset"
+down_revision = "0002_hot_table_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    create_index_online(
+        "ix_exchange_history_created_at_id",
+        "exchange_history",
+        [sa.text("created_at DESC"), sa.text("id DESC")]
+    )
+
+
+def downgrade():
+    drop_index_online("ix_exchange_history_created_at_id", "exchange_history")
@@ -0,0 +1,99 @@
+"""Indexes for the paginated, searchable admin user directory
+
+Revision ID: 0004_user_directory
+Revises: 0003_exchange_history_keyset
+Create Date: 2026-10-18
+
+Keyset paging over users and substring search over username/email.
+SQLite gets an external-content FTS5 table with the trigram tokenizer kept in
+sync by triggers; PostgreSQL gets pg_trgm GIN indexes so ILIKE '%q%' can use them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_index_online, drop_index_online, has_table, is_postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0004_user_directory"
+down_revision = "0003_exchange_history_keyset"
+branch_labels = None
+depends_on = None
+
+
+SQLITE_FTS_STATEMENTS = [
+    """
+    CREATE VIRTUAL TABLE users_fts USING fts5(
+        username, email, content='users', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER users_fts_ai AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts(rowid, username, email) VALUES (new.id, new.username, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER users_fts_ad AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, username, email)
+        VALUES ('delete', old.id, old.username, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER users_fts_au AFTER UPDATE OF username, email ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, username, email)
+        VALUES ('delete', old.id, old.username, old.email);
+        INSERT INTO users_fts(rowid, username, email) VALUES (new.id, new.username, new.email);
+    END
+    """,
+    "INSERT INTO users_fts(users_fts) VALUES ('rebuild')",
+]
+
+
+def _sqlite_supports_trigram() -> bool:
+    # The trigram tokenizer needs SQLite 3.34+ built with FTS5
+    try:
+        op.execute("CREATE VIRTUAL TABLE temp.users_fts_probe USING fts5(x, tokenize='trigram')")
+    except sa.exc.OperationalError:
+        return False
+    op.execute("DROP TABLE temp.users_fts_probe")
+    return True
+
+
+def upgrade():
+    create_index_online("ix_users_created_at_id", "users", [sa.text("created_at DESC"), sa.text("id DESC")])
+    create_index_online(
+        "ix_users_verification_status_created_at",
+        "users",
+        ["verification_status", sa.text("created_at DESC")]
+    )
+    
+    bind = op.get_bind()
+    if is_postgresql():
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for column in ("username", "email"):
+            create_index_online(
+                f"ix_users_{column}_trgm",
+                "users",
+                [column],
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"}
+            )
+    elif bind.dialect.name == "sqlite" and not has_table("users_fts"):
+        # Without trigram support the app falls back to LIKE scans
+        if _sqlite_supports_trigram():
+            for statement in SQLITE_FTS_STATEMENTS:
+                op.execute(statement)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if is_postgresql():
+        drop_index_online("ix_users_email_trgm", "users")
+        drop_index_online("ix_users_username_trgm", "users")
+    elif bind.dialect.name == "sqlite":
+        for trigger in ("users_fts_au", "users_fts_ad", "users_fts_ai"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS users_fts")
+    
+    drop_index_online("ix_users_verification_status_created_at", "users")
+    drop_index_online("ix_users_created_at_id", "users")
@@ -0,0 +1,37 @@
+"""Counters table for the admin dashboard statistics
+
+Revision ID: 0005_stat_counters
+Revises: 0004_user_directory
+Create Date: 2026-10-18
+
+The table starts empty; the app reconciles it from the source tables on startup.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import has_table
+
+
+# revision identifiers, used by Alembic.
+revision = "0005_stat_counters"
+down_revision = "0004_user_directory"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if has_table("stat_counters"):
+        return
+    op.create_table(
+        "stat_counters",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("amount_give", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("amount_get", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("name")
+    )
+
+
+def downgrade():
+    op.drop_table("stat_counters")
@@ -0,0 +1,35 @@
+"""Digest and detected content type for verification uploads
+
+Revision ID: 0006_verification_digest
+Revises: 0005_stat_counters
+Create Date: 2026-10-18
+
+Both columns are nullable; rows uploaded before this revision keep NULLs.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import has_column
+
+
+# revision identifiers, used by Alembic.
+revision = "0006_verification_digest"
+down_revision = "0005_stat_counters"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    add_digest = not has_column("verification_requests", "file_sha256")
+    add_content_type = not has_column("verification_requests", "content_type")
+    with op.batch_alter_table("verification_requests") as batch:
+        if add_digest:
+            batch.add_column(sa.Column("file_sha256", sa.String(64), nullable=True))
+        if add_content_type:
+            batch.add_column(sa.Column("content_type", sa.String(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("verification_requests") as batch:
+        batch.drop_column("content_type")
+        batch.drop_column("file_sha256")
@@ -0,0 +1,48 @@
+"""Processing results for verification documents
+
+Revision ID: 0007_verification_processing
+Revises: 0006_verification_digest
+Create Date: 2026-10-18
+
+Existing requests are marked pending so the document pipeline generates
+their previews and thumbnails on the next startup.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import has_column
+
+
+# revision identifiers, used by Alembic.
+revision = "0007_verification_processing"
+down_revision = "0006_verification_digest"
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = [
+    sa.Column("processing_status", sa.String(), nullable=True),
+    sa.Column("processing_error", sa.Text(), nullable=True),
+    sa.Column("image_width", sa.Integer(), nullable=True),
+    sa.Column("image_height", sa.Integer(), nullable=True),
+    sa.Column("preview_path", sa.String(), nullable=True),
+    sa.Column("thumbnail_path", sa.String(), nullable=True),
+]
+
+
+def upgrade():
+    missing = [column for column in COLUMNS if not has_column("verification_requests", column.name)]
+    if missing:
+        with op.batch_alter_table("verification_requests") as batch:
+            for column in missing:
+                batch.add_column(column)
+    
+    op.execute(
+        "UPDATE verification_requests SET processing_status = 'pending' WHERE processing_status IS NULL"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("verification_requests") as batch:
+        for column in reversed(COLUMNS):
+            batch.drop_column(column.name)
@@ -0,0 +1,49 @@
+"""Content-addressed storage for verification uploads
+
+Revision ID: 0008_document_blobs
+Revises: 0007_verification_processing
+Create Date: 2026-10-18
+
+Files uploaded earlier keep their paths until the document compactor moves
+them into the store and creates their blobs.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_index_online, drop_index_online, has_table
+
+
+# revision identifiers, used by Alembic.
+revision = "0008_document_blobs"
+down_revision = "0007_verification_processing"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_table("document_blobs"):
+        op.create_table(
+            "document_blobs",
+            sa.Column("sha256", sa.String(64), nullable=False),
+            sa.Column("path", sa.String(), nullable=False),
+            sa.Column("content_type", sa.String(), nullable=False),
+            sa.Column("size", sa.Integer(), nullable=False),
+            sa.Column("stored_size", sa.Integer(), nullable=False),
+            sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("released_at", sa.DateTime(), nullable=True),
+            sa.Column("recompressed_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("sha256")
+        )
+        op.create_index(
+            "ix_document_blobs_ref_count_released_at",
+            "document_blobs",
+            ["ref_count", "released_at"]
+        )
+    
+    create_index_online("ix_verification_requests_file_sha256", "verification_requests", ["file_sha256"])
+
+
+def downgrade():
+    drop_index_online("ix_verification_requests_file_sha256", "verification_requests")
+    op.drop_table("document_blobs")
@@ -0,0 +1,50 @@
+"""Store verification documents by blob store key
+
+Revision ID: 0009_blob_store_keys
+Revises: 0008_document_blobs
+Create Date: 2026-10-18
+
+Paths of content-addressed files lose their upload dir prefix and become
+keys relative to the storage backend ("objects/aa/bb/<sha256>.png").
+Legacy uploads keep their local paths until the compactor adopts them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision = "0009_blob_store_keys"
+down_revision = "0008_document_blobs"
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = [
+    ("document_blobs", "path"),
+    ("verification_requests", "file_path"),
+    ("verification_requests", "preview_path"),
+    ("verification_requests", "thumbnail_path"),
+]
+
+
+def _upload_prefix() -> str:
+    return settings.verification_upload_dir.rstrip("/") + "/"
+
+
+def upgrade():
+    prefix = _upload_prefix()
+    for table, column in COLUMNS:
+        op.execute(sa.text(
+            f"UPDATE {table} SET {column} = substr({column}, :start) "
+            f"WHERE substr({column}, 1, :length) = :objects"
+        ).bindparams(start=len(prefix) + 1, length=len(prefix) + len("objects/"), objects=prefix + "objects/"))
+
+
+def downgrade():
+    prefix = _upload_prefix()
+    for table, column in COLUMNS:
+        op.execute(sa.text(
+            f"UPDATE {table} SET {column} = :prefix || {column} WHERE {column} LIKE 'objects/%'"
+        ).bindparams(prefix=prefix))
@@ -0,0 +1,31 @@
+"""Last upstream status check of a bid
+
+Revision ID: 0010_bid_status_checked_at
+Revises: 0009_blob_store_keys
+Create Date: 2026-10-18
+
+The status poller records when it last checked each bid and loads the
+least recently checked ones first.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import has_column
+
+
+# revision identifiers, used by Alembic.
+revision = "0010_bid_status_checked_at"
+down_revision = "0009_blob_store_keys"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_column("exchange_history", "status_checked_at"):
+        with op.batch_alter_table("exchange_history") as batch:
+            batch.add_column(sa.Column("status_checked_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("exchange_history") as batch:
+        batch.drop_column("status_checked_at")
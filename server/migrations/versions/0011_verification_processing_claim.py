@@ -0,0 +1,35 @@
+"""Claim time of verification document processing
+
+Revision ID: 0011_verification_processing_claim
+Revises: 0010_bid_status_checked_at
+Create Date: 2026-10-18
+
+A worker sets processing_status to 'processing' and this timestamp before
+it processes a document, so app processes do not process the same one
+twice and claims left by a crashed process can be taken over.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import has_column
+
+
+# revision identifiers, used by Alembic.
+revision = "0011_verification_processing_claim"
+down_revision = "0010_bid_status_checked_at"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_column("verification_requests", "processing_started_at"):
+        with op.batch_alter_table("verification_requests") as batch:
+            batch.add_column(sa.Column("processing_started_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.execute(
+        "UPDATE verification_requests SET processing_status = 'pending' WHERE processing_status = 'processing'"
+    )
+    with op.batch_alter_table("verification_requests") as batch:
+        batch.drop_column("processing_started_at")
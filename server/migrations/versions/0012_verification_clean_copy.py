@@ -0,0 +1,36 @@
+"""Verification document copy without metadata
+
+Revision ID: 0012_verification_clean_copy
+Revises: 0011_verification_processing_claim
+Create Date: 2026-10-18
+
+Admins download a re-written copy of the original with EXIF/GPS, text
+and comment blocks removed instead of the uploaded bytes. Documents that
+are already processed are queued again so they get the copy.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import has_column
+
+
+# revision identifiers, used by Alembic.
+revision = "0012_verification_clean_copy"
+down_revision = "0011_verification_processing_claim"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_column("verification_requests", "clean_path"):
+        with op.batch_alter_table("verification_requests") as batch:
+            batch.add_column(sa.Column("clean_path", sa.String(), nullable=True))
+    op.execute(
+        "UPDATE verification_requests SET processing_status = 'pending' "
+        "WHERE processing_status = 'ready' AND clean_path IS NULL"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("verification_requests") as batch:
+        batch.drop_column("clean_path")
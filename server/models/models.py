@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -21,6 +21,13 @@ class User(Base):
     exchanges = relationship("ExchangeHistory", back_populates="user")
     verification_requests = relationship("VerificationRequest", back_populates="user", foreign_keys="VerificationRequest.user_id")
 
+    # Text search over username/email uses dialect-specific indexes created in
+    # migrations/versions/0004_user_directory (FTS5 on SQLite, pg_trgm on PostgreSQL)
+    __table_args__ = (
+        Index("ix_users_created_at_id", created_at.desc(), id.desc()),
+        Index("ix_users_verification_status_created_at", verification_status, created_at.desc()),
+    )
+
 
 class ExchangeHistory(Base):
     __tablename__ = "exchange_history"
@@ -49,12 +56,21 @@ class ExchangeHistory(Base):
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    status_checked_at = Column(DateTime, nullable=True)  # last upstream status check by the poller
     
     # Additional data as JSON string
     additional_data = Column(Text, nullable=True)
     
     # Relationship to user
     user = relationship("User", back_populates="exchanges") 
+    
+    # Indexes are created by migrations (see migrations/versions)
+    __table_args__ = (
+        Index("ix_exchange_history_user_id_created_at", user_id, created_at.desc()),
+        Index("ix_exchange_history_status_created_at", status, created_at.desc()),
+        Index("ix_exchange_history_bid_id", bid_id),
+        Index("ix_exchange_history_created_at_id", created_at.desc(), id.desc()),
+    )
 
 
 class VerificationRequest(Base):
@@ -65,6 +81,16 @@ class VerificationRequest(Base):
     filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
     file_size = Column(Integer, nullable=False)
+    file_sha256 = Column(String(64), nullable=True)  # hex digest computed while streaming the upload
+    content_type = Column(String, nullable=True)  # detected from the file signature
+    processing_status = Column(String, default="pending")  # pending, processing, ready, invalid, failed, skipped, missing, purged
+    processing_started_at = Column(DateTime, nullable=True)  # when a worker claimed the document
+    processing_error = Column(Text, nullable=True)
+    image_width = Column(Integer, nullable=True)
+    image_height = Column(Integer, nullable=True)
+    clean_path = Column(String, nullable=True)  # the original without metadata, served to admins
+    preview_path = Column(String, nullable=True)  # downscaled JPEG without metadata
+    thumbnail_path = Column(String, nullable=True)
     status = Column(String, default="pending")  # pending, approved, rejected
     admin_comment = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -72,4 +98,48 @@ class VerificationRequest(Base):
     processed_by = Column(Integer, ForeignKey("users.id"), nullable=True)  # Admin user ID who reviewed
     
     # Relationships
-    user = relationship("User", back_populates="verification_requests", foreign_keys=[user_id]) 
\ No newline at end of file
+    user = relationship("User", back_populates="verification_requests", foreign_keys=[user_id])
+    
+    __table_args__ = (
+        Index("ix_verification_requests_user_id_status", user_id, status),
+        Index("ix_verification_requests_status_created_at", status, created_at.desc()),
+        Index("ix_verification_requests_file_sha256", file_sha256),
+    )
+
+
+class DocumentBlob(Base):
+    """One stored upload, addressed by the SHA-256 of its bytes.
+    
+    ref_count is the number of verification requests using the file; it is
+    changed in the same transaction as those rows. Blobs that drop to zero
+    are deleted by the compaction job after a grace period.
+    """
+    __tablename__ = "document_blobs"
+    
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String, nullable=False)
+    content_type = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)  # bytes as uploaded
+    stored_size = Column(Integer, nullable=False)  # bytes on disk, smaller once recompressed
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    released_at = Column(DateTime, nullable=True)  # when ref_count last reached zero
+    recompressed_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_document_blobs_ref_count_released_at", ref_count, released_at),
+    ) 
+
+class StatCounter(Base):
+    """Running totals behind the admin dashboard.
+    
+    Maintained by services/admin_stats.py in the same transaction as the
+    change they count and periodically reconciled against the source tables.
+    """
+    __tablename__ = "stat_counters"
+    
+    name = Column(String, primary_key=True)  # users, users_verified, verifications_pending, exchanges:<status>
+    count = Column(Integer, nullable=False, default=0)
+    amount_give = Column(Float, nullable=False, default=0.0)
+    amount_get = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
@@ -1,23 +1,87 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Request, Response
+from fastapi.responses import FileResponse, RedirectResponse
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import List, Optional, Tuple
 from datetime import datetime
+from email.utils import parsedate_to_datetime
+import asyncio
+import os
 
 from auth.dependencies import get_db, get_current_admin
+from auth.user_cache import auth_cache
 from models.models import User, VerificationRequest, ExchangeHistory
 from schemas.admin import (
     VerificationRequestResponse,
     VerificationApprovalRequest,
     UserListResponse,
-    AdminStatsResponse
+    AdminStatsResponse,
+    ExchangeStatusStats
 )
 from schemas.history import ExchangeHistoryResponse, ExchangeHistoryUpdate
+from core.config import settings
+from core.pagination import paginate_keyset, set_cursor_headers
+from services.user_directory import user_directory_search
+from services.admin_stats import StatsChange, read_stats
+from services.blob_store import blob_store
+from services.document_storage import is_object_key
 from pydantic import BaseModel
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
+DOCUMENT_URL_FIELDS = {"original": "file_url", "preview": "preview_url", "thumbnail": "thumbnail_url"}
+
+
+def document_variant(req: VerificationRequest, variant: str) -> Tuple[Optional[str], Optional[str]]:
+    """Stored path and content type of one variant of a request's document"""
+    if variant == "preview":
+        return req.preview_path, "image/jpeg"
+    if variant == "thumbnail":
+        return req.thumbnail_path, "image/jpeg"
+    # The uploaded bytes themselves may carry EXIF/GPS data and are never served
+    return req.clean_path, req.content_type
+
+
+def document_urls(req: VerificationRequest) -> dict:
+    """Download links for a request's stored files.
+    
+    S3 storage hands out presigned URLs; everything else links to the admin
+    document endpoint.
+    """
+    if req.processing_status == "purged":
+        return {}
+    urls = {}
+    for variant, field in DOCUMENT_URL_FIELDS.items():
+        path, content_type = document_variant(req, variant)
+        if not path:
+            continue
+        url = blob_store.presigned_url(path, content_type) if is_object_key(path) else None
+        if url is None:
+            url = router.url_path_for("get_verification_document", request_id=str(req.id)) + f"?variant={variant}"
+        urls[field] = url
+    return urls
+
+
+def not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """Evaluate If-None-Match, or failing that If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have whole-second precision
+        return int(last_modified) <= since
+    return False
+
+
 class ExchangeStatusUpdate(BaseModel):
     status: str
     admin_comment: Optional[str] = None
@@ -49,16 +113,19 @@ class AdminExchangeResponse(BaseModel):
 
 @router.get("/verification-requests", response_model=List[VerificationRequestResponse])
 async def get_verification_requests(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
     """Get all pending verification requests"""
     try:
-        requests = db.query(VerificationRequest).options(
-            joinedload(VerificationRequest.user)
-        ).filter(
-            VerificationRequest.status == "pending"
-        ).order_by(VerificationRequest.created_at.desc()).all()
+        result = await db.execute(
+            select(VerificationRequest).options(
+                joinedload(VerificationRequest.user)
+            ).where(
+                VerificationRequest.status == "pending"
+            ).order_by(VerificationRequest.created_at.desc())
+        )
+        requests = result.scalars().all()
         
         return [
             VerificationRequestResponse(
@@ -69,7 +136,13 @@ async def get_verification_requests(
                 file_path=req.file_path,
                 status=req.status,
                 created_at=req.created_at,
-                admin_comment=req.admin_comment
+                admin_comment=req.admin_comment,
+                processing_status=req.processing_status,
+                image_width=req.image_width,
+                image_height=req.image_height,
+                thumbnail_path=req.thumbnail_path,
+                preview_path=req.preview_path,
+                **document_urls(req)
             )
             for req in requests
         ]
@@ -80,14 +153,17 @@ async def get_verification_requests(
 
 @router.get("/verification-requests/all", response_model=List[VerificationRequestResponse])
 async def get_all_verification_requests(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
     """Get all verification requests (approved, rejected, pending)"""
     try:
-        requests = db.query(VerificationRequest).options(
-            joinedload(VerificationRequest.user)
-        ).order_by(VerificationRequest.created_at.desc()).all()
+        result = await db.execute(
+            select(VerificationRequest).options(
+                joinedload(VerificationRequest.user)
+            ).order_by(VerificationRequest.created_at.desc())
+        )
+        requests = result.scalars().all()
         
         return [
             VerificationRequestResponse(
@@ -100,7 +176,13 @@ async def get_all_verification_requests(
                 created_at=req.created_at,
                 updated_at=req.updated_at,
                 admin_comment=req.admin_comment,
-                processed_by=req.processed_by
+                processed_by=req.processed_by,
+                processing_status=req.processing_status,
+                image_width=req.image_width,
+                image_height=req.image_height,
+                thumbnail_path=req.thumbnail_path,
+                preview_path=req.preview_path,
+                **document_urls(req)
             )
             for req in requests
         ]
@@ -109,50 +191,158 @@ async def get_all_verification_requests(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.api_route("/verification-requests/{request_id}/document", methods=["GET", "HEAD"])
+async def get_verification_document(
+    request_id: int,
+    request: Request,
+    variant: str = Query("original", pattern="^(original|preview|thumbnail)$"),
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(get_current_admin)
+):
+    """Download a verification document: the original upload, its preview or its thumbnail.
+    
+    Local files are sent with Range, ETag/Last-Modified and 304 support, or
+    handed to nginx with X-Accel-Redirect when a prefix is configured so it
+    can sendfile them. With S3 storage the client is redirected to a
+    presigned URL and the bytes never pass through the app.
+    """
+    verification_request = await db.get(VerificationRequest, request_id)
+    if not verification_request:
+        raise HTTPException(
+            status_code=404,
+            detail="Verification request not found"
+        )
+    if verification_request.processing_status == "purged":
+        raise HTTPException(
+            status_code=410,
+            detail="Verification document has been deleted"
+        )
+    
+    key, content_type = document_variant(verification_request, variant)
+    if not key:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Verification document has no {variant}"
+        )
+    cache_control = f"private, max-age={settings.document_cache_max_age}"
+    
+    if is_object_key(key):
+        # Every store either hands out URLs (S3) or has the file on local disk
+        url = blob_store.presigned_url(key, content_type)
+        if url:
+            return RedirectResponse(url, status_code=307, headers={"Cache-Control": "no-store"})
+        path = blob_store.local_path(key)
+    else:
+        # Legacy upload, still on local disk until the compactor adopts it
+        path = key
+    
+    try:
+        stat_result = await asyncio.to_thread(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Verification document file not found")
+    
+    response = FileResponse(
+        path,
+        media_type=content_type,
+        headers={"Cache-Control": cache_control},
+        filename=f"verification-{request_id}-{variant}{os.path.splitext(path)[1]}",
+        content_disposition_type="inline",
+        stat_result=stat_result
+    )
+    validators = {name: response.headers[name] for name in ("etag", "last-modified", "cache-control")}
+    if not_modified(request, validators["etag"], stat_result.st_mtime):
+        return Response(status_code=304, headers=validators)
+    
+    if settings.document_accel_redirect_prefix and is_object_key(key):
+        # nginx sends the file itself, zero-copy and with Range/conditional handling
+        return Response(
+            media_type=response.media_type,
+            headers={
+                **validators,
+                "Content-Disposition": response.headers["content-disposition"],
+                "X-Accel-Redirect": settings.document_accel_redirect_prefix + key
+            }
+        )
+    return response
+
+
+async def decide_verification(db: AsyncSession, request_id: int, decision: str,
+                              comment: Optional[str], admin: User) -> Optional[str]:
+    """Move a pending verification request to `decision` and update its user.
+    
+    Both changes are conditional UPDATEs and the counters are only adjusted
+    for the rows that actually changed, so two admins deciding the same
+    request at once cannot count it twice. Returns the username whose
+    cached profile is now stale.
+    """
+    result = await db.execute(select(VerificationRequest.user_id, VerificationRequest.status).where(
+        VerificationRequest.id == request_id
+    ))
+    row = result.first()
+    
+    if not row:
+        raise HTTPException(
+            status_code=404,
+            detail="Verification request not found"
+        )
+    
+    decided = await db.execute(
+        update(VerificationRequest).where(
+            VerificationRequest.id == request_id,
+            VerificationRequest.status == "pending"
+        ).values(
+            status=decision,
+            admin_comment=comment,
+            processed_by=admin.id,
+            updated_at=datetime.utcnow()
+        )
+    )
+    if decided.rowcount != 1:
+        raise HTTPException(
+            status_code=400,
+            detail="Verification request is not pending"
+        )
+    
+    stats = StatsChange().verification_pending(-1)
+    verified = decision == "approved"
+    flipped = await db.execute(
+        update(User).where(
+            User.id == row.user_id,
+            func.coalesce(User.is_verified, False) != verified
+        ).values(is_verified=verified, verification_status=decision)
+    )
+    if flipped.rowcount == 1:
+        stats.user_verified(not verified, verified)
+    else:
+        await db.execute(update(User).where(User.id == row.user_id).values(verification_status=decision))
+    
+    await stats.apply(db)
+    result = await db.execute(select(User.username).where(User.id == row.user_id))
+    return result.scalar()
+
+
 @router.post("/verification-requests/{request_id}/approve")
 async def approve_verification(
     request_id: int,
     approval_data: VerificationApprovalRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
     """Approve verification request"""
     try:
-        verification_request = db.query(VerificationRequest).filter(
-            VerificationRequest.id == request_id
-        ).first()
-        
-        if not verification_request:
-            raise HTTPException(
-                status_code=404,
-                detail="Verification request not found"
-            )
-        
-        if verification_request.status != "pending":
-            raise HTTPException(
-                status_code=400,
-                detail="Verification request is not pending"
-            )
-        
-        # Update verification request
-        verification_request.status = "approved"
-        verification_request.admin_comment = approval_data.comment
-        verification_request.processed_by = admin.id
-        verification_request.updated_at = datetime.utcnow()
-        
-        # Update user
-        user = db.query(User).filter(User.id == verification_request.user_id).first()
-        if user:
-            user.is_verified = True
-            user.verification_status = "approved"
-        
-        db.commit()
+        username = await decide_verification(db, request_id, "approved", approval_data.comment, admin)
+        await db.commit()
+        if username:
+            auth_cache.invalidate(username)
         
         return {"success": True, "message": "Verification approved successfully"}
         
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
         logger.error(f"Error approving verification: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -160,57 +350,58 @@ async def approve_verification(
 async def reject_verification(
     request_id: int,
     rejection_data: VerificationApprovalRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
     """Reject verification request"""
     try:
-        verification_request = db.query(VerificationRequest).filter(
-            VerificationRequest.id == request_id
-        ).first()
-        
-        if not verification_request:
-            raise HTTPException(
-                status_code=404,
-                detail="Verification request not found"
-            )
-        
-        if verification_request.status != "pending":
-            raise HTTPException(
-                status_code=400,
-                detail="Verification request is not pending"
-            )
-        
-        # Update verification request
-        verification_request.status = "rejected"
-        verification_request.admin_comment = rejection_data.comment
-        verification_request.processed_by = admin.id
-        verification_request.updated_at = datetime.utcnow()
-        
-        # Update user
-        user = db.query(User).filter(User.id == verification_request.user_id).first()
-        if user:
-            user.is_verified = False
-            user.verification_status = "rejected"
-        
-        db.commit()
+        username = await decide_verification(db, request_id, "rejected", rejection_data.comment, admin)
+        await db.commit()
+        if username:
+            auth_cache.invalidate(username)
         
         return {"success": True, "message": "Verification rejected successfully"}
         
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
         logger.error(f"Error rejecting verification: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/users", response_model=List[UserListResponse])
 async def get_users(
-    db: Session = Depends(get_db),
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    verification_status: Optional[str] = None,
+    is_verified: Optional[bool] = None,
+    is_active: Optional[bool] = None,
+    q: Optional[str] = Query(None, max_length=254, description="Substring of username or email"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor / X-Prev-Cursor from a previous page"),
+    db: AsyncSession = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
-    """Get all users"""
+    """Get users page by page, newest first, with optional filters and search"""
     try:
-        users = db.query(User).order_by(User.created_at.desc()).all()
+        query = select(User)
+        
+        if verification_status:
+            query = query.where(User.verification_status == verification_status)
+        if is_verified is not None:
+            query = query.where(User.is_verified == is_verified)
+        if is_active is not None:
+            query = query.where(User.is_active == is_active)
+        if q:
+            search = await user_directory_search.clause(db, q)
+            if search is not None:
+                query = query.where(search)
+        
+        page = await paginate_keyset(db, query, User, limit, cursor=cursor, skip=skip)
+        set_cursor_headers(response, page)
+        users = page.items
         
         return [
             UserListResponse(
@@ -224,6 +415,8 @@ async def get_users(
             )
             for user in users
         ]
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting users: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -231,22 +424,27 @@ async def get_users(
 
 @router.get("/stats", response_model=AdminStatsResponse)
 async def get_admin_stats(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
-    """Get admin dashboard statistics"""
+    """Get admin dashboard statistics from the maintained counters"""
     try:
-        total_users = db.query(User).count()
-        verified_users = db.query(User).filter(User.is_verified == True).count()
-        pending_verifications = db.query(VerificationRequest).filter(
-            VerificationRequest.status == "pending"
-        ).count()
+        stats = await read_stats(db)
         
         return AdminStatsResponse(
-            total_users=total_users,
-            verified_users=verified_users,
-            pending_verifications=pending_verifications,
-            unverified_users=total_users - verified_users
+            total_users=stats.total_users,
+            verified_users=stats.verified_users,
+            pending_verifications=stats.pending_verifications,
+            unverified_users=stats.total_users - stats.verified_users,
+            total_exchanges=sum(item.count for item in stats.exchanges.values()),
+            exchanges_by_status={
+                status_name: ExchangeStatusStats(
+                    count=item.count,
+                    amount_give=item.amount_give,
+                    amount_get=item.amount_get
+                )
+                for status_name, item in stats.exchanges.items()
+            }
         )
     except Exception as e:
         logger.error(f"Error getting admin stats: {str(e)}")
@@ -255,22 +453,26 @@ async def get_admin_stats(
 
 @router.get("/exchanges", response_model=List[AdminExchangeResponse])
 async def get_all_exchanges(
-    skip: int = 0,
-    limit: int = 50,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
     status_filter: Optional[str] = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor / X-Prev-Cursor from a previous page"),
+    db: AsyncSession = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
-    """Get all exchanges for admin management"""
+    """Get all exchanges for admin management, newest first"""
     try:
-        query = db.query(ExchangeHistory).options(
+        query = select(ExchangeHistory).options(
             joinedload(ExchangeHistory.user)
         )
         
         if status_filter:
-            query = query.filter(ExchangeHistory.status == status_filter)
+            query = query.where(ExchangeHistory.status == status_filter)
         
-        exchanges = query.order_by(ExchangeHistory.created_at.desc()).offset(skip).limit(limit).all()
+        page = await paginate_keyset(db, query, ExchangeHistory, limit, cursor=cursor, skip=skip)
+        set_cursor_headers(response, page)
+        exchanges = page.items
         
         return [
             AdminExchangeResponse(
@@ -295,6 +497,8 @@ async def get_all_exchanges(
             )
             for exchange in exchanges
         ]
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting exchanges: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -304,14 +508,15 @@ async def get_all_exchanges(
 async def update_exchange_status_admin(
     exchange_id: int,
     status_update: ExchangeStatusUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
     """Update exchange status as admin"""
     try:
-        exchange = db.query(ExchangeHistory).filter(
+        result = await db.execute(select(ExchangeHistory).where(
             ExchangeHistory.id == exchange_id
-        ).first()
+        ))
+        exchange = result.scalars().first()
         
         if not exchange:
             raise HTTPException(
@@ -319,34 +524,53 @@ async def update_exchange_status_admin(
                 detail="Exchange not found"
             )
         
-        # Update status
-        exchange.status = status_update.status
-        exchange.updated_at = datetime.utcnow()
+        # Update status only if nobody changed it since it was read, so the
+        # counters move from the status that is actually replaced
+        old_status = exchange.status
+        updated = await db.execute(
+            update(ExchangeHistory).where(
+                ExchangeHistory.id == exchange_id,
+                ExchangeHistory.status.is_not_distinct_from(old_status)
+            ).values(status=status_update.status, updated_at=datetime.utcnow())
+        )
+        if updated.rowcount != 1:
+            raise HTTPException(
+                status_code=409,
+                detail="Exchange status was changed concurrently"
+            )
+        await StatsChange().exchange_status(
+            old_status, status_update.status, exchange.amount_give, exchange.amount_get
+        ).apply(db)
         
-        db.commit()
-        db.refresh(exchange)
+        await db.commit()
         
         logger.info(f"Exchange {exchange_id} status updated to {status_update.status} by admin {admin.username}")
         
         return {"success": True, "message": f"Status updated to {status_update.status}"}
         
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
         logger.error(f"Error updating exchange status: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/exchanges/{exchange_id}")
 async def get_exchange_details_admin(
     exchange_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
     """Get exchange details for admin"""
     try:
-        exchange = db.query(ExchangeHistory).options(
-            joinedload(ExchangeHistory.user)
-        ).filter(ExchangeHistory.id == exchange_id).first()
+        result = await db.execute(
+            select(ExchangeHistory).options(
+                joinedload(ExchangeHistory.user)
+            ).where(ExchangeHistory.id == exchange_id)
+        )
+        exchange = result.scalars().first()
         
         if not exchange:
             raise HTTPException(
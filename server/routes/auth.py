@@ -1,23 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from auth.dependencies import get_db, get_current_user
-from auth.auth_utils import get_password_hash, verify_password, create_access_token
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from auth.dependencies import get_db, get_current_user, get_user_by_username
+from auth.auth_utils import create_access_token
+from auth.password_hasher import password_hasher, HasherBusyError
+from auth.user_cache import auth_cache
 from models.models import User
 from schemas.auth import UserCreate, UserLogin, UserResponse, Token
+from services.admin_stats import StatsChange
 import logging
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 logger = logging.getLogger(__name__)
 
 
+def hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many authentication requests, please try again shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register", response_model=UserResponse)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user"""
     try:
         # Check if user already exists
-        existing_user = db.query(User).filter(
+        result = await db.execute(select(User).where(
             (User.email == user_data.email) | (User.username == user_data.username)
-        ).first()
+        ))
+        existing_user = result.scalars().first()
         
         if existing_user:
             if existing_user.email == user_data.email:
@@ -32,7 +45,10 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
                 )
         
         # Create new user
-        hashed_password = get_password_hash(user_data.password)
+        try:
+            hashed_password = await password_hasher.hash(user_data.password)
+        except HasherBusyError:
+            raise hasher_busy()
         db_user = User(
             username=user_data.username,
             email=user_data.email,
@@ -40,8 +56,9 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
         
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await StatsChange().user_registered().apply(db)
+        await db.commit()
+        await db.refresh(db_user)
         
         logger.info(f"New user registered: {user_data.username}")
         return db_user
@@ -50,7 +67,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         raise
     except Exception as e:
         logger.error(f"Error registering user: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Registration failed"
@@ -58,13 +75,22 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
     """Login user and return JWT token"""
     try:
         # Find user
-        user = db.query(User).filter(User.username == user_data.username).first()
+        user = await get_user_by_username(db, user_data.username)
         
-        if not user or not verify_password(user_data.password, user.hashed_password):
+        verified, new_hash = False, None
+        if user:
+            try:
+                verified, new_hash = await password_hasher.verify_and_update(
+                    user_data.password, user.hashed_password
+                )
+            except HasherBusyError:
+                raise hasher_busy()
+        
+        if not verified:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password",
@@ -77,6 +103,13 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
                 detail="Inactive user"
             )
         
+        # Stored hash uses an outdated work factor
+        if new_hash:
+            user.hashed_password = new_hash
+            await db.commit()
+            auth_cache.invalidate(user.username)
+            logger.info(f"Password hash upgraded for user: {user.username}")
+        
         # Create access token
         access_token = create_access_token(data={"sub": user.username})
         
@@ -1,8 +1,8 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
 from typing import List, Optional
+import asyncio
 import logging
-import requests
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 
 from schemas.exchange import (
     DirectionResponse,
@@ -12,10 +12,14 @@ from schemas.exchange import (
     StatusResponse,
     ErrorResponse
 )
-from services.wirebit_client import wirebit_client
+from services.wirebit_client import wirebit_client, TERMINAL_STATUSES
+from services.status_broadcaster import status_broadcaster
+from services.rates_feed import negotiate_encoding
+from services.admin_stats import StatsChange
+from core.config import settings
 from auth.dependencies import get_db, get_current_user_optional
 from models.models import User, ExchangeHistory
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from routes.verification import check_verification_required
 import json
 
@@ -28,8 +32,8 @@ router = APIRouter(prefix="/api", tags=["exchange"])
 async def get_directions():
     """Get all exchange directions from Wirebit"""
     try:
-        directions = wirebit_client.get_directions()
-        return directions
+        catalog = await wirebit_client.get_catalog()
+        return catalog.directions
     except Exception as e:
         logger.error(f"Error in get_directions: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -39,21 +43,8 @@ async def get_directions():
 async def get_currencies():
     """Get list of unique currencies available for sending"""
     try:
-        directions = wirebit_client.get_directions()
-        
-        # Extract unique "from" currencies
-        currencies_dict = {}
-        for direction in directions:
-            from_currency = direction.get("from")
-            from_logo = direction.get("from_logo")
-            
-            if from_currency and from_currency not in currencies_dict:
-                currencies_dict[from_currency] = {
-                    "title": from_currency,
-                    "logo": from_logo
-                }
-        
-        return list(currencies_dict.values())
+        catalog = await wirebit_client.get_catalog()
+        return catalog.currencies
         
     except Exception as e:
         logger.error(f"Error in get_currencies: {str(e)}")
@@ -64,22 +55,8 @@ async def get_currencies():
 async def get_available_to(from_currency: str = Query(..., alias="from")):
     """Get list of currencies available to receive for a given 'from' currency"""
     try:
-        directions = wirebit_client.get_directions()
-        
-        # Filter directions by from_currency and extract unique "to" currencies
-        currencies_dict = {}
-        for direction in directions:
-            if direction.get("from") == from_currency:
-                to_currency = direction.get("to")
-                to_logo = direction.get("to_logo")
-                
-                if to_currency and to_currency not in currencies_dict:
-                    currencies_dict[to_currency] = {
-                        "title": to_currency,
-                        "logo": to_logo
-                    }
-        
-        return list(currencies_dict.values())
+        catalog = await wirebit_client.get_catalog()
+        return catalog.currencies_to(from_currency)
         
     except Exception as e:
         logger.error(f"Error in get_available_to: {str(e)}")
@@ -89,14 +66,14 @@ async def get_available_to(from_currency: str = Query(..., alias="from")):
 @router.post("/create-exchange", response_model=CreateExchangeResponse)
 async def create_exchange(
     request: CreateExchangeRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """Create exchange bid"""
     try:
         # Get direction details for verification check
-        directions = wirebit_client.get_directions()
-        direction = next((d for d in directions if d["direction_id"] == request.direction_id), None)
+        catalog = await wirebit_client.get_catalog()
+        direction = catalog.get(request.direction_id)
         
         if not direction:
             raise HTTPException(
@@ -135,7 +112,7 @@ async def create_exchange(
                         verification_required=True
                     )
         
-        result = wirebit_client.create_bid(
+        result = await wirebit_client.create_bid(
             direction_id=request.direction_id,
             amount=request.amount,
             account_to=request.account_to,
@@ -182,7 +159,10 @@ async def create_exchange(
                     )
                     
                     db.add(history_record)
-                    db.commit()
+                    await StatsChange().exchange_created(
+                        history_record.status, history_record.amount_give, history_record.amount_get
+                    ).apply(db)
+                    await db.commit()
                     logger.info(f"Exchange saved to history for user {current_user.username}")
                     
             except Exception as history_error:
@@ -204,7 +184,7 @@ async def create_exchange(
 async def get_status(bid_id: str = Query(...)):
     """Get bid status"""
     try:
-        result = wirebit_client.get_status(bid_id)
+        result = await wirebit_client.get_status(bid_id)
         return StatusResponse(**result)
         
     except Exception as e:
@@ -215,26 +195,76 @@ async def get_status(bid_id: str = Query(...)):
         )
 
 
+@router.get("/status/stream")
+async def stream_status(bid_id: List[str] = Query(...)):
+    """Push bid status changes as server-sent events.
+    
+    Subscribe with one or more bid_id parameters; the stream sends the current
+    status of each bid, then one event per change, and ends once every bid
+    reached a final state.
+    """
+    bid_ids = list(dict.fromkeys(bid_id))
+    if len(bid_ids) > settings.status_stream_max_bids:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Можно отслеживать не более {settings.status_stream_max_bids} заявок"
+        )
+    
+    async def events():
+        pending = set(bid_ids)
+        async with status_broadcaster.subscribe(bid_ids) as subscription:
+            while pending:
+                try:
+                    changed_bid, result = await asyncio.wait_for(
+                        subscription.get(), timeout=settings.status_stream_heartbeat
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                payload = {"bid_id": changed_bid, **StatusResponse(**result).model_dump()}
+                yield f"event: status\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+                
+                if result.get("status") in TERMINAL_STATUSES:
+                    pending.discard(changed_bid)
+        
+        yield "event: end\ndata: {}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/rates")
-async def get_rates():
-    """Get exchange rates from Wirebit XML feed"""
+async def get_rates(request: Request):
+    """Get exchange rates from the cached Wirebit XML feed"""
     try:
-        response = requests.get('https://wirebit.net/request-exportxml.xml', 
-                              headers={'Accept': 'application/xml'})
-        
-        if not response.ok:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail="Failed to fetch rates from Wirebit"
-            )
-        
-        return Response(
-            content=response.text,
-            media_type="application/xml"
-        )
+        feed = await wirebit_client.get_rates_feed()
     except Exception as e:
         logger.error(f"Error fetching rates: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=str(e)
         )
+    
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), feed.variants)
+    headers = {
+        "ETag": feed.etag_for(encoding),
+        "Last-Modified": feed.fetched_at,
+        "Cache-Control": f"public, max-age={settings.rates_cache_max_age}",
+        "Vary": "Accept-Encoding"
+    }
+    
+    if feed.not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since")):
+        return Response(status_code=304, headers=headers)
+    
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    
+    return Response(
+        content=feed.variants[encoding],
+        media_type="application/xml",
+        headers=headers
+    )
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from auth.dependencies import get_db, get_current_active_user
 from models.models import User, ExchangeHistory
 from schemas.history import ExchangeHistoryCreate, ExchangeHistoryResponse, ExchangeHistoryUpdate
+from core.pagination import paginate_keyset, set_cursor_headers
+from services.admin_stats import StatsChange
 import logging
 import json
 
@@ -13,22 +16,27 @@ logger = logging.getLogger(__name__)
 
 @router.get("/", response_model=List[ExchangeHistoryResponse])
 async def get_user_history(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     status_filter: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor / X-Prev-Cursor from a previous page"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get exchange history for current user"""
+    """Get exchange history for current user, newest first"""
     try:
-        query = db.query(ExchangeHistory).filter(ExchangeHistory.user_id == current_user.id)
+        query = select(ExchangeHistory).where(ExchangeHistory.user_id == current_user.id)
         
         if status_filter:
-            query = query.filter(ExchangeHistory.status == status_filter)
+            query = query.where(ExchangeHistory.status == status_filter)
         
-        history = query.order_by(ExchangeHistory.created_at.desc()).offset(skip).limit(limit).all()
-        return history
+        page = await paginate_keyset(db, query, ExchangeHistory, limit, cursor=cursor, skip=skip)
+        set_cursor_headers(response, page)
+        return page.items
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting user history: {str(e)}")
         raise HTTPException(
@@ -41,7 +49,7 @@ async def get_user_history(
 async def create_exchange_record(
     exchange_data: ExchangeHistoryCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new exchange history record"""
     try:
@@ -51,15 +59,18 @@ async def create_exchange_record(
         )
         
         db.add(db_exchange)
-        db.commit()
-        db.refresh(db_exchange)
+        await StatsChange().exchange_created(
+            db_exchange.status, db_exchange.amount_give, db_exchange.amount_get
+        ).apply(db)
+        await db.commit()
+        await db.refresh(db_exchange)
         
         logger.info(f"Exchange record created for user {current_user.username}: {db_exchange.id}")
         return db_exchange
         
     except Exception as e:
         logger.error(f"Error creating exchange record: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create exchange record"
@@ -70,14 +81,15 @@ async def create_exchange_record(
 async def get_exchange_details(
     exchange_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get specific exchange details"""
     try:
-        exchange = db.query(ExchangeHistory).filter(
+        result = await db.execute(select(ExchangeHistory).where(
             ExchangeHistory.id == exchange_id,
             ExchangeHistory.user_id == current_user.id
-        ).first()
+        ))
+        exchange = result.scalars().first()
         
         if not exchange:
             raise HTTPException(
@@ -102,14 +114,15 @@ async def update_exchange_status(
     exchange_id: int,
     update_data: ExchangeHistoryUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update exchange status (usually called by webhooks or status checker)"""
     try:
-        exchange = db.query(ExchangeHistory).filter(
+        result = await db.execute(select(ExchangeHistory).where(
             ExchangeHistory.id == exchange_id,
             ExchangeHistory.user_id == current_user.id
-        ).first()
+        ))
+        exchange = result.scalars().first()
         
         if not exchange:
             raise HTTPException(
@@ -118,11 +131,16 @@ async def update_exchange_status(
             )
         
         # Update fields
-        for field, value in update_data.dict(exclude_unset=True).items():
+        changes = update_data.dict(exclude_unset=True)
+        if "status" in changes:
+            await StatsChange().exchange_status(
+                exchange.status, changes["status"], exchange.amount_give, exchange.amount_get
+            ).apply(db)
+        for field, value in changes.items():
             setattr(exchange, field, value)
         
-        db.commit()
-        db.refresh(exchange)
+        await db.commit()
+        await db.refresh(exchange)
         
         logger.info(f"Exchange {exchange_id} updated for user {current_user.username}")
         return exchange
@@ -131,7 +149,7 @@ async def update_exchange_status(
         raise
     except Exception as e:
         logger.error(f"Error updating exchange: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update exchange"
@@ -1,23 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from auth.dependencies import get_db, get_current_active_user
+from auth.user_cache import auth_cache
 from models.models import User, VerificationRequest
 from schemas.verification import VerificationRequestResponse, UserVerificationStatus, VerificationCheckResponse
-from datetime import datetime
+from services.admin_stats import StatsChange
+from services.document_storage import save_upload, acquire, UploadTooLargeError, UnsupportedContentError
+from core.config import settings
+from services.document_pipeline import document_pipeline
 import os
-import uuid
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/verification", tags=["verification"])
 
 # Create uploads directory if it doesn't exist
-UPLOAD_DIR = "uploads/verification"
+UPLOAD_DIR = settings.verification_upload_dir
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 # Allowed file types and max size
 ALLOWED_EXTENSIONS = {'.gif', '.jpg', '.jpeg', '.jpe', '.png'}
 MAX_FILE_SIZE = 128 * 1024 * 1024  # 128MB
+MAX_FILE_SIZE_DETAIL = "Размер файла превышает 128МБ"
 
 def check_verification_required(from_currency: str, to_currency: str) -> bool:
     """Check if verification is required for this exchange"""
@@ -64,13 +69,16 @@ async def check_verification_required_endpoint(
 @router.get("/status", response_model=UserVerificationStatus)
 async def get_verification_status(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get user's verification status"""
     # Get latest verification request
-    latest_request = db.query(VerificationRequest).filter(
-        VerificationRequest.user_id == current_user.id
-    ).order_by(VerificationRequest.created_at.desc()).first()
+    result = await db.execute(
+        select(VerificationRequest).where(
+            VerificationRequest.user_id == current_user.id
+        ).order_by(VerificationRequest.created_at.desc()).limit(1)
+    )
+    latest_request = result.scalars().first()
     
     return UserVerificationStatus(
         is_verified=current_user.is_verified,
@@ -82,15 +90,16 @@ async def get_verification_status(
 async def submit_verification_request(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Submit verification request with document upload"""
     
     # Check if user already has pending or approved verification
-    existing_request = db.query(VerificationRequest).filter(
+    result = await db.execute(select(VerificationRequest).where(
         VerificationRequest.user_id == current_user.id,
         VerificationRequest.status.in_(["pending", "approved"])
-    ).first()
+    ))
+    existing_request = result.scalars().first()
     
     if existing_request:
         if existing_request.status == "approved":
@@ -118,22 +127,20 @@ async def submit_verification_request(
             detail="Недопустимый тип файла. Разрешены: GIF, JPG, JPEG, PNG"
         )
     
-    # Read file content to check size
-    file_content = await file.read()
-    if len(file_content) > MAX_FILE_SIZE:
+    # Stream into the content-addressed store, checking size and signature on the way
+    try:
+        stored = await save_upload(file, UPLOAD_DIR, MAX_FILE_SIZE)
+    except UploadTooLargeError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Размер файла превышает 128МБ"
+            detail=MAX_FILE_SIZE_DETAIL
+        )
+    except UnsupportedContentError as e:
+        logger.warning(f"Rejected verification upload from {current_user.username}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Содержимое файла не является изображением GIF, JPG или PNG"
         )
-    
-    # Generate unique filename
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
-    
-    # Save file
-    try:
-        with open(file_path, "wb") as f:
-            f.write(file_content)
     except Exception as e:
         logger.error(f"Error saving file: {str(e)}")
         raise HTTPException(
@@ -145,18 +152,26 @@ async def submit_verification_request(
     verification_request = VerificationRequest(
         user_id=current_user.id,
         filename=file.filename,
-        file_path=file_path,
-        file_size=len(file_content),
+        file_path=stored.path,
+        file_size=stored.size,
+        file_sha256=stored.sha256,
+        content_type=stored.content_type,
         status="pending"
     )
     
     db.add(verification_request)
+    await acquire(db, stored)
     
     # Update user verification status
     current_user.verification_status = "pending"
     
-    db.commit()
-    db.refresh(verification_request)
+    await StatsChange().verification_pending(1).apply(db)
+    await db.commit()
+    auth_cache.invalidate(current_user.username)
+    await db.refresh(verification_request)
+    
+    # Preview/thumbnail generation runs in the background
+    document_pipeline.submit(verification_request.id, verification_request.file_path)
     
     logger.info(f"Verification request submitted by user {current_user.username}")
     
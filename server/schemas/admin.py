@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, Optional
 from datetime import datetime
 
 
@@ -14,6 +14,15 @@ class VerificationRequestResponse(BaseModel):
     updated_at: Optional[datetime] = None
     admin_comment: Optional[str] = None
     processed_by: Optional[int] = None
+    processing_status: Optional[str] = None
+    image_width: Optional[int] = None
+    image_height: Optional[int] = None
+    thumbnail_path: Optional[str] = None
+    preview_path: Optional[str] = None
+    # Presigned links on S3 storage, the admin document endpoint otherwise
+    file_url: Optional[str] = None
+    preview_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
 
 
 class VerificationApprovalRequest(BaseModel):
@@ -30,8 +39,16 @@ class UserListResponse(BaseModel):
     created_at: datetime
 
 
+class ExchangeStatusStats(BaseModel):
+    count: int
+    amount_give: float
+    amount_get: float
+
+
 class AdminStatsResponse(BaseModel):
     total_users: int
     verified_users: int
     pending_verifications: int
-    unverified_users: int 
\ No newline at end of file
+    unverified_users: int
+    total_exchanges: int = 0
+    exchanges_by_status: Dict[str, ExchangeStatusStats] = {} 
\ No newline at end of file
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import math
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from database import AsyncSessionLocal, dialect_insert
+from models.models import ExchangeHistory, StatCounter, User, VerificationRequest
+
+
+logger = logging.getLogger(__name__)
+
+USERS = "users"
+USERS_VERIFIED = "users_verified"
+VERIFICATIONS_PENDING = "verifications_pending"
+EXCHANGE_PREFIX = "exchanges:"
+
+
+class CounterDelta(NamedTuple):
+    count: int = 0
+    amount_give: float = 0.0
+    amount_get: float = 0.0
+
+
+class StatsSnapshot(NamedTuple):
+    total_users: int
+    verified_users: int
+    pending_verifications: int
+    exchanges: Dict[str, CounterDelta]
+
+
+def exchange_counter(status: Optional[str]) -> str:
+    return f"{EXCHANGE_PREFIX}{status or 'unknown'}"
+
+
+class StatsChange:
+    """Counter adjustments collected while a request mutates the source rows.
+    
+    Call `apply` before the commit so the counters move in the same
+    transaction as the change they describe.
+    """
+    
+    def __init__(self):
+        self._deltas: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+    
+    def _add(self, name: str, count: int, amount_give: float = 0.0, amount_get: float = 0.0):
+        delta = self._deltas[name]
+        delta[0] += count
+        delta[1] += amount_give
+        delta[2] += amount_get
+    
+    def user_registered(self) -> "StatsChange":
+        self._add(USERS, 1)
+        return self
+    
+    def user_verified(self, was_verified: bool, is_verified: bool) -> "StatsChange":
+        if bool(was_verified) != bool(is_verified):
+            self._add(USERS_VERIFIED, 1 if is_verified else -1)
+        return self
+    
+    def verification_pending(self, delta: int) -> "StatsChange":
+        self._add(VERIFICATIONS_PENDING, delta)
+        return self
+    
+    def exchange_created(self, status: Optional[str], amount_give: float, amount_get: float) -> "StatsChange":
+        self._add(exchange_counter(status), 1, amount_give or 0.0, amount_get or 0.0)
+        return self
+    
+    def exchange_status(self, old_status: Optional[str], new_status: Optional[str],
+                        amount_give: float, amount_get: float) -> "StatsChange":
+        if exchange_counter(old_status) != exchange_counter(new_status):
+            self._add(exchange_counter(old_status), -1, -(amount_give or 0.0), -(amount_get or 0.0))
+            self._add(exchange_counter(new_status), 1, amount_give or 0.0, amount_get or 0.0)
+        return self
+    
+    def rows(self) -> List[dict]:
+        now = datetime.utcnow()
+        return [
+            {"name": name, "count": count, "amount_give": give, "amount_get": get, "updated_at": now}
+            for name, (count, give, get) in self._deltas.items()
+            if count or give or get
+        ]
+    
+    async def apply(self, db: AsyncSession):
+        rows = self.rows()
+        if rows:
+            await _upsert(db, rows, increment=True)
+
+
+async def _upsert(db: AsyncSession, rows: List[dict], increment: bool):
+    """INSERT ... ON CONFLICT that adds to (or overwrites) the existing counters"""
+    stmt = dialect_insert(db)(StatCounter)
+    excluded = stmt.excluded
+    if increment:
+        values = {
+            "count": StatCounter.count + excluded.count,
+            "amount_give": StatCounter.amount_give + excluded.amount_give,
+            "amount_get": StatCounter.amount_get + excluded.amount_get,
+        }
+    else:
+        values = {
+            "count": excluded.count,
+            "amount_give": excluded.amount_give,
+            "amount_get": excluded.amount_get,
+        }
+    values["updated_at"] = excluded.updated_at
+    stmt = stmt.on_conflict_do_update(index_elements=[StatCounter.name], set_=values)
+    await db.execute(stmt, rows)
+
+
+async def read_stats(db: AsyncSession) -> StatsSnapshot:
+    """All dashboard figures from the counters table in one query"""
+    result = await db.execute(select(StatCounter))
+    counters = {row.name: row for row in result.scalars().all()}
+    
+    def count(name: str) -> int:
+        row = counters.get(name)
+        return row.count if row else 0
+    
+    exchanges = {
+        name[len(EXCHANGE_PREFIX):]: CounterDelta(row.count, row.amount_give, row.amount_get)
+        for name, row in counters.items()
+        if name.startswith(EXCHANGE_PREFIX) and row.count
+    }
+    return StatsSnapshot(
+        total_users=count(USERS),
+        verified_users=count(USERS_VERIFIED),
+        pending_verifications=count(VERIFICATIONS_PENDING),
+        exchanges=exchanges
+    )
+
+
+async def reconcile(db: AsyncSession) -> int:
+    """Recount everything from the source tables and overwrite the counters.
+    
+    Returns how many counters had drifted. Changes committed while the
+    recount runs can leave a small error that the next pass corrects.
+    """
+    users = (await db.execute(select(
+        func.count(User.id),
+        func.coalesce(func.sum(case((User.is_verified == True, 1), else_=0)), 0)
+    ))).one()
+    pending = await db.scalar(
+        select(func.count()).select_from(VerificationRequest).where(VerificationRequest.status == "pending")
+    )
+    by_status = await db.execute(
+        select(
+            ExchangeHistory.status,
+            func.count(ExchangeHistory.id),
+            func.coalesce(func.sum(ExchangeHistory.amount_give), 0.0),
+            func.coalesce(func.sum(ExchangeHistory.amount_get), 0.0)
+        ).group_by(ExchangeHistory.status)
+    )
+    
+    expected: Dict[str, CounterDelta] = {
+        USERS: CounterDelta(users[0]),
+        USERS_VERIFIED: CounterDelta(int(users[1])),
+        VERIFICATIONS_PENDING: CounterDelta(pending or 0),
+    }
+    for status, count, amount_give, amount_get in by_status.all():
+        name = exchange_counter(status)
+        previous = expected.get(name, CounterDelta())
+        expected[name] = CounterDelta(
+            previous.count + count,
+            previous.amount_give + float(amount_give),
+            previous.amount_get + float(amount_get)
+        )
+    
+    current = {row.name: row for row in (await db.execute(select(StatCounter))).scalars().all()}
+    # Statuses that no longer occur are zeroed rather than deleted
+    for name in current:
+        expected.setdefault(name, CounterDelta())
+    
+    drifted = [
+        name for name, value in expected.items()
+        if name not in current
+        or current[name].count != value.count
+        or not math.isclose(current[name].amount_give, value.amount_give, abs_tol=1e-6)
+        or not math.isclose(current[name].amount_get, value.amount_get, abs_tol=1e-6)
+    ]
+    if drifted:
+        now = datetime.utcnow()
+        await _upsert(db, [
+            {"name": name, "count": expected[name].count, "amount_give": expected[name].amount_give,
+             "amount_get": expected[name].amount_get, "updated_at": now}
+            for name in drifted
+        ], increment=False)
+    await db.commit()
+    return len(drifted)
+
+
+class StatsReconciler:
+    """Periodically recounts the dashboard statistics to repair any drift"""
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        """Seed the counters and start the reconcile loop"""
+        await self.run_once()
+        self._task = asyncio.create_task(self._run(), name="stats-reconciler")
+        logger.info(f"Stats reconciler started (interval {self.interval}s)")
+    
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Stats reconciler stopped")
+    
+    async def run_once(self) -> int:
+        try:
+            async with AsyncSessionLocal() as db:
+                drifted = await reconcile(db)
+        except Exception as e:
+            logger.error(f"Stats reconcile failed: {str(e)}")
+            return 0
+        if drifted:
+            logger.info(f"Reconciled {drifted} admin stat counters")
+        return drifted
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.run_once()
+
+
+# Singleton instance
+stats_reconciler = StatsReconciler(settings.stats_reconcile_interval)
@@ -0,0 +1,310 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+import os
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, NamedTuple, Optional
+
+from core.config import settings
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+except ImportError:  # optional, only needed for STORAGE_BACKEND=s3
+    boto3 = None
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+WORK_DIR_PREFIX = ".work-"  # temporary directories of S3BlobStore.local_copy
+
+
+class BlobInfo(NamedTuple):
+    key: str
+    size: int
+    modified: float  # unix time
+    etag: str
+
+
+class BlobStore(ABC):
+    """Where stored verification documents live.
+    
+    Keys are relative "/"-separated paths such as objects/ab/cd/<sha256>.png.
+    Files are produced on local disk first (streamed uploads, generated
+    variants) and handed over with `put_file`; reads stream in chunks.
+    """
+    
+    name = "base"
+    
+    @abstractmethod
+    async def put_file(self, key: str, local_path: str, content_type: str):
+        """Move a finished local file into the store under `key`"""
+    
+    @abstractmethod
+    async def stat(self, key: str) -> Optional[BlobInfo]:
+        """Size, modification time and etag of a blob, or None when it does not exist"""
+    
+    @abstractmethod
+    async def delete(self, key: str):
+        """Remove a blob; a missing one is not an error"""
+    
+    @abstractmethod
+    async def list(self, prefix: str, start_after: str = "", limit: Optional[int] = None) -> List[BlobInfo]:
+        """Blobs under `prefix` in key order, starting after key `start_after`"""
+    
+    @abstractmethod
+    def local_copy(self, key: str):
+        """Async context manager yielding a local file path with the blob's content.
+        
+        Files written next to that path are removed on exit unless they were
+        handed over with `put_file`.
+        """
+    
+    @abstractmethod
+    def iter_bytes(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Stream bytes start..end (inclusive) of a blob"""
+    
+    def presigned_url(self, key: str, content_type: Optional[str] = None,
+                      filename: Optional[str] = None) -> Optional[str]:
+        """Time-limited direct download URL, or None when the store has none"""
+        return None
+    
+    def local_path(self, key: str) -> Optional[str]:
+        """Path of the blob on this machine's disk, or None when it is remote"""
+        return None
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under a local directory"""
+    
+    name = "local"
+    
+    def __init__(self, root: str):
+        self.root = root
+    
+    def path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, *key.split("/")))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Invalid blob key: {key}")
+        return path
+    
+    async def put_file(self, key: str, local_path: str, content_type: str):
+        target = self.path(key)
+        if os.path.abspath(local_path) == os.path.abspath(target):
+            return
+        
+        def move():
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(local_path, target)
+        
+        await asyncio.to_thread(move)
+    
+    async def stat(self, key: str) -> Optional[BlobInfo]:
+        try:
+            stat = await asyncio.to_thread(os.stat, self.path(key))
+        except FileNotFoundError:
+            return None
+        return BlobInfo(key, stat.st_size, stat.st_mtime, f"{stat.st_size:x}-{stat.st_mtime_ns:x}")
+    
+    async def delete(self, key: str):
+        try:
+            await asyncio.to_thread(os.unlink, self.path(key))
+        except FileNotFoundError:
+            pass
+    
+    async def list(self, prefix: str, start_after: str = "", limit: Optional[int] = None) -> List[BlobInfo]:
+        found: List[BlobInfo] = []
+        
+        def visit(path: str, key_prefix: str) -> bool:
+            """Add files under `path` in key order; False once `limit` is reached"""
+            try:
+                with os.scandir(path) as scan:
+                    entries = [(entry.name + "/" if entry.is_dir() else entry.name, entry) for entry in scan]
+            except (FileNotFoundError, NotADirectoryError):
+                return True
+            for name, entry in sorted(entries, key=lambda item: item[0]):
+                key = key_prefix + name
+                if entry.is_dir():
+                    # Skip subtrees that lie wholly before start_after
+                    if (key > start_after or start_after.startswith(key)) and not visit(entry.path, key):
+                        return False
+                    continue
+                if key <= start_after:
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                found.append(BlobInfo(key, stat.st_size, stat.st_mtime, f"{stat.st_size:x}-{stat.st_mtime_ns:x}"))
+                if limit is not None and len(found) >= limit:
+                    return False
+            return True
+        
+        def walk():
+            directory = prefix.rstrip("/")
+            visit(self.path(directory), directory + "/")
+            return found
+        
+        return await asyncio.to_thread(walk)
+    
+    def local_path(self, key: str) -> Optional[str]:
+        return self.path(key)
+    
+    @asynccontextmanager
+    async def local_copy(self, key: str) -> AsyncIterator[str]:
+        # Already local; variants written next to it are in place too
+        yield self.path(key)
+    
+    async def iter_bytes(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        handle = await asyncio.to_thread(open, self.path(key), "rb")
+        try:
+            await asyncio.to_thread(handle.seek, start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                size = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+                chunk = await asyncio.to_thread(handle.read, size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            await asyncio.to_thread(handle.close)
+
+
+class S3BlobStore(BlobStore):
+    """Blobs in an S3-compatible bucket (AWS S3, MinIO, ...).
+    
+    boto3 is synchronous, so every call runs in a worker thread. Uploads use
+    boto3's managed multipart transfer straight from the local file, and
+    admins can be handed presigned GET URLs so downloads bypass the app.
+    """
+    
+    name = "s3"
+    
+    def __init__(self, bucket: str, prefix: str, work_dir: str, presign_expiry: int, **client_options):
+        if boto3 is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.work_dir = work_dir
+        self.presign_expiry = presign_expiry
+        self._client_options = client_options
+        self._client = None
+    
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = boto3.client("s3", **self._client_options)
+        return self._client
+    
+    def object_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+    
+    async def put_file(self, key: str, local_path: str, content_type: str):
+        await asyncio.to_thread(
+            self.client.upload_file,
+            local_path,
+            self.bucket,
+            self.object_key(key),
+            ExtraArgs={"ContentType": content_type}
+        )
+        await asyncio.to_thread(os.unlink, local_path)
+    
+    async def stat(self, key: str) -> Optional[BlobInfo]:
+        try:
+            head = await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self.object_key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return BlobInfo(key, head["ContentLength"], head["LastModified"].timestamp(), head["ETag"].strip('"'))
+    
+    async def delete(self, key: str):
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=self.object_key(key))
+    
+    async def list(self, prefix: str, start_after: str = "", limit: Optional[int] = None) -> List[BlobInfo]:
+        def collect():
+            found = []
+            paginator = self.client.get_paginator("list_objects_v2")
+            options = {"Bucket": self.bucket, "Prefix": self.object_key(prefix)}
+            if start_after:
+                options["StartAfter"] = self.object_key(start_after)
+            if limit is not None:
+                options["PaginationConfig"] = {"MaxItems": limit}
+            for page in paginator.paginate(**options):
+                for item in page.get("Contents", []):
+                    found.append(BlobInfo(
+                        item["Key"][len(self.prefix):],
+                        item["Size"],
+                        item["LastModified"].timestamp(),
+                        item["ETag"].strip('"')
+                    ))
+            return found
+        
+        return await asyncio.to_thread(collect)
+    
+    @asynccontextmanager
+    async def local_copy(self, key: str) -> AsyncIterator[str]:
+        os.makedirs(self.work_dir, exist_ok=True)
+        work_dir = tempfile.mkdtemp(prefix=WORK_DIR_PREFIX, dir=self.work_dir)
+        path = os.path.join(work_dir, key.rsplit("/", 1)[-1])
+        try:
+            await asyncio.to_thread(self.client.download_file, self.bucket, self.object_key(key), path)
+            yield path
+        finally:
+            await asyncio.to_thread(shutil.rmtree, work_dir, True)
+    
+    async def iter_bytes(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        response = await asyncio.to_thread(
+            self.client.get_object, Bucket=self.bucket, Key=self.object_key(key), Range=byte_range
+        )
+        body = response["Body"]
+        try:
+            while True:
+                chunk = await asyncio.to_thread(body.read, CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+    
+    def presigned_url(self, key: str, content_type: Optional[str] = None,
+                      filename: Optional[str] = None) -> Optional[str]:
+        params = {"Bucket": self.bucket, "Key": self.object_key(key)}
+        if content_type:
+            params["ResponseContentType"] = content_type
+        if filename:
+            params["ResponseContentDisposition"] = f'inline; filename="{filename}"'
+        # Signed locally, no request is made
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=self.presign_expiry)
+
+
+def create_blob_store() -> BlobStore:
+    if settings.storage_backend not in ("local", "s3"):
+        raise ValueError(f"Unknown STORAGE_BACKEND: {settings.storage_backend}")
+    if settings.storage_backend == "s3":
+        return S3BlobStore(
+            bucket=settings.s3_bucket,
+            prefix=settings.s3_prefix,
+            work_dir=settings.verification_upload_dir,
+            presign_expiry=settings.s3_presign_expiry,
+            endpoint_url=settings.s3_endpoint_url or None,
+            region_name=settings.s3_region or None,
+            aws_access_key_id=settings.s3_access_key_id or None,
+            aws_secret_access_key=settings.s3_secret_access_key or None,
+            config=BotoConfig(
+                s3={"addressing_style": settings.s3_addressing_style},
+                max_pool_connections=settings.s3_max_connections
+            )
+        )
+    return LocalBlobStore(settings.verification_upload_dir)
+
+
+# Singleton instance
+blob_store = create_blob_store()
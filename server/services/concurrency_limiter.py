@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class LimiterTimeoutError(Exception):
+    """Raised when a caller could not get a slot before its deadline or the queue is full"""
+
+
+# Weights of the short (about the last 10 calls) and long (about 100 calls)
+# moving averages of latency
+SHORT_WINDOW_WEIGHT = 0.1
+LONG_WINDOW_WEIGHT = 0.01
+
+
+class _LatencyTracker:
+    """Short- and long-window moving averages of one endpoint's latency"""
+    
+    __slots__ = ("short", "long")
+    
+    def __init__(self, latency: float):
+        self.short = latency
+        self.long = latency
+    
+    def add(self, latency: float):
+        self.short += (latency - self.short) * SHORT_WINDOW_WEIGHT
+        self.long += (latency - self.long) * LONG_WINDOW_WEIGHT
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on concurrent upstream calls, driven by observed latency.
+    
+    Latency is tracked per `key` (the upstream endpoint), since endpoints
+    differ in how long a healthy call takes. While an endpoint's short-window
+    average stays within `latency_tolerance` times its long-window average,
+    each call grows the limit by roughly one per window of calls; when the
+    short window rises above that, or on a transport failure, the limit is
+    multiplied by `backoff_ratio`. That happens at most once per window:
+    calls that were already in flight when the limit was last lowered do
+    not lower it again. Averaging keeps ordinary jitter from counting as
+    congestion. Callers over the limit wait in a FIFO queue
+    until a slot frees up or their deadline passes.
+    """
+    
+    def __init__(self, name: str, initial_limit: int, min_limit: int, max_limit: int,
+                 latency_tolerance: float, backoff_ratio: float, max_queue: int):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.max_queue = max_queue
+        self._limit = float(min(max(initial_limit, self.min_limit), max_limit))
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._latency: Dict[str, _LatencyTracker] = {}
+        self._last_decrease = float("-inf")
+    
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "queue_depth": len(self._waiters),
+            "latency_ms": {
+                key: {"short": round(tracker.short * 1000, 1), "long": round(tracker.long * 1000, 1)}
+                for key, tracker in self._latency.items()
+            }
+        }
+    
+    @asynccontextmanager
+    async def acquire(self, key: str = "default", timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold one slot for the duration of the block; `key` names the endpoint called"""
+        await self._acquire(timeout)
+        started = time.monotonic()
+        try:
+            yield
+        except asyncio.CancelledError:
+            self._release()
+            raise
+        except BaseException:
+            # Transport failures are the strongest overload signal
+            self._release()
+            self._decrease(started)
+            raise
+        else:
+            self._release()
+            self._observe(key, started, time.monotonic() - started)
+    
+    async def _acquire(self, timeout: Optional[float]):
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return
+        
+        if len(self._waiters) >= self.max_queue:
+            raise LimiterTimeoutError(f"Limiter '{self.name}' queue is full")
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up, pass it on
+                self._release()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                raise LimiterTimeoutError(f"Timed out waiting for limiter '{self.name}'")
+            raise
+    
+    def _release(self):
+        self._in_flight -= 1
+        self._wake()
+    
+    def _wake(self):
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._in_flight += 1
+            waiter.set_result(None)
+    
+    def _observe(self, key: str, started: float, latency: float):
+        tracker = self._latency.get(key)
+        if tracker is None:
+            self._latency[key] = _LatencyTracker(latency)
+            return
+        # The long window drifts up too, so a permanent shift is eventually accepted
+        tracker.add(latency)
+        
+        if tracker.short > tracker.long * self.latency_tolerance:
+            self._decrease(started)
+        else:
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._wake()
+    
+    def _decrease(self, started: float):
+        if started < self._last_decrease:
+            # Sent under the old limit, its outcome is already accounted for
+            return
+        self._last_decrease = time.monotonic()
+        previous = self.limit
+        self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+        if self.limit < previous:
+            logger.debug(f"Limiter '{self.name}' limit lowered to {self.limit}")
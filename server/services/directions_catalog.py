@@ -0,0 +1,62 @@
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, Mapping
+
+
+class DirectionsCatalog:
+    """Immutable view of the exchange directions with precomputed indexes.
+    
+    Built once per upstream change so catalog endpoints answer with dict
+    lookups instead of scanning the directions list on every request.
+    """
+    
+    def __init__(self, directions: List[Dict[str, Any]], fingerprint: Optional[str] = None):
+        self.fingerprint = fingerprint
+        self.directions: List[Dict[str, Any]] = list(directions)
+        
+        by_id = {}
+        currencies = {}
+        available_to: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        
+        for direction in self.directions:
+            by_id[direction.get("direction_id")] = direction
+            
+            from_currency = direction.get("from")
+            to_currency = direction.get("to")
+            if not from_currency:
+                continue
+            
+            # Distinct "give" currencies, first logo wins like the old scan did
+            if from_currency not in currencies:
+                currencies[from_currency] = {
+                    "title": from_currency,
+                    "logo": direction.get("from_logo")
+                }
+            
+            # give -> get adjacency
+            targets = available_to.setdefault(from_currency, {})
+            if to_currency and to_currency not in targets:
+                targets[to_currency] = {
+                    "title": to_currency,
+                    "logo": direction.get("to_logo")
+                }
+        
+        self.by_id: Mapping[Any, Dict[str, Any]] = MappingProxyType(by_id)
+        self.currencies: List[Dict[str, Any]] = list(currencies.values())
+        self.available_to: Mapping[str, List[Dict[str, Any]]] = MappingProxyType({
+            from_currency: list(targets.values())
+            for from_currency, targets in available_to.items()
+        })
+    
+    def __len__(self) -> int:
+        return len(self.directions)
+    
+    def get(self, direction_id: Any) -> Optional[Dict[str, Any]]:
+        """Find a direction by its Wirebit id"""
+        return self.by_id.get(direction_id)
+    
+    def currencies_to(self, from_currency: str) -> List[Dict[str, Any]]:
+        """Currencies that can be received for the given 'from' currency"""
+        return self.available_to.get(from_currency, [])
+
+
+EMPTY_CATALOG = DirectionsCatalog([])
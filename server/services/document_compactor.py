@@ -0,0 +1,482 @@
+import asyncio
+import logging
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import and_, delete, or_, select, update
+
+from core.config import settings
+from database import AsyncSessionLocal
+from models.models import DocumentBlob, VerificationRequest
+from services.blob_store import WORK_DIR_PREFIX, BlobStore, blob_store
+from services.document_pipeline import (
+    PACKED_SUFFIX,
+    PREVIEW_SUFFIX,
+    THUMBNAIL_SUFFIX,
+    DocumentPipeline,
+    clean_path,
+    document_pipeline,
+    recompress_png,
+    variant_path
+)
+from services.document_storage import (
+    OBJECTS_DIR,
+    TEMP_SUFFIX,
+    StoredDocument,
+    acquire,
+    hash_file,
+    is_object_key,
+    object_digest,
+    object_key,
+    release,
+    sniff_content_type
+)
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+ORPHAN_SCAN_PAGE = 1000  # stored objects checked per pass; the scan resumes where it stopped
+
+
+class CompactionReport(NamedTuple):
+    adopted: int = 0
+    purged: int = 0
+    removed_files: int = 0
+    recompressed: int = 0
+    freed_bytes: int = 0
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _remove_local_if_older(path: str, cutoff: float) -> int:
+    """Delete local file `path` unless it was written after `cutoff`; returns bytes freed"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return 0
+    if stat.st_mtime >= cutoff:
+        return 0
+    os.unlink(path)
+    return stat.st_size
+
+
+def _blob_files(path: str) -> List[str]:
+    """An upload, its copy without metadata, its preview and its thumbnail"""
+    return [path, clean_path(path), variant_path(path, PREVIEW_SUFFIX), variant_path(path, THUMBNAIL_SUFFIX)]
+
+
+def _blob_keys(sha256: str, content_type: str) -> List[str]:
+    """Every key a blob can occupy, including its recompressed copy"""
+    original = object_key(sha256, content_type)
+    return _blob_files(original) + [variant_path(original, PACKED_SUFFIX)]
+
+
+def _identify_legacy(legacy_path: str) -> Optional[StoredDocument]:
+    """Digest and key of a pre-content-addressing upload still on local disk"""
+    if not os.path.exists(legacy_path):
+        return None
+    with open(legacy_path, "rb") as f:
+        content_type = sniff_content_type(f.read(16))
+    if content_type is None:
+        return None
+    
+    sha256 = hash_file(legacy_path)
+    return StoredDocument(
+        path=object_key(sha256, content_type),
+        size=_file_size(legacy_path),
+        sha256=sha256,
+        content_type=content_type
+    )
+
+
+def _scan_loose(directory: str, cutoff: float) -> List[str]:
+    """Top-level files older than `cutoff`: legacy uploads and abandoned temp files"""
+    loose = []
+    if not os.path.isdir(directory):
+        return loose
+    for entry in os.scandir(directory):
+        if entry.name.startswith(".") and not entry.name.endswith(TEMP_SUFFIX):
+            continue
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            loose.append(entry.path)
+    return loose
+
+
+def _sweep_work_dirs(directory: str, cutoff: float) -> Tuple[int, int]:
+    """Remove local_copy work directories a crashed process left behind.
+    
+    Returns the number of files removed and their size.
+    """
+    removed = freed = 0
+    if not os.path.isdir(directory):
+        return removed, freed
+    for entry in os.scandir(directory):
+        if not entry.name.startswith(WORK_DIR_PREFIX) or not entry.is_dir():
+            continue
+        if entry.stat().st_mtime >= cutoff:
+            continue
+        for root, _, files in os.walk(entry.path):
+            removed += len(files)
+            freed += sum(_file_size(os.path.join(root, name)) for name in files)
+        shutil.rmtree(entry.path, ignore_errors=True)
+    return removed, freed
+
+
+class DocumentCompactor:
+    """Retention and compaction for the content-addressed upload store.
+    
+    Each pass moves legacy uploads into the store, releases documents of
+    long-rejected requests when a retention period is set, deletes blobs
+    and files nothing references once they are older than the grace period,
+    and losslessly repacks PNG originals of settled requests. `directory` is
+    the local upload dir, which holds legacy uploads and upload temp files.
+    
+    Every app process runs one, so each step only acts on rows its own
+    conditional UPDATE or DELETE actually changed.
+    """
+    
+    def __init__(self, directory: str, store: BlobStore, pipeline: DocumentPipeline, interval: float,
+                 orphan_grace: float, retention_days: int, recompress_after_days: int):
+        self.directory = directory
+        self.store = store
+        self.pipeline = pipeline
+        self.interval = interval
+        self.orphan_grace = orphan_grace
+        self.retention_days = retention_days
+        self.recompress_after_days = recompress_after_days
+        self._scan_after = ""  # last object key checked by the orphan scan
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        self._task = asyncio.create_task(self._run(), name="document-compactor")
+        logger.info(f"Document compactor started (interval {self.interval}s)")
+    
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Document compactor stopped")
+    
+    async def _run(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+    
+    async def run_once(self) -> CompactionReport:
+        report = CompactionReport()
+        for step in (self._adopt_legacy, self._purge_expired, self._collect_garbage, self._recompress):
+            try:
+                report = await step(report)
+            except Exception as e:
+                logger.error(f"Document compaction step {step.__name__} failed: {str(e)}")
+        if any(report):
+            logger.info(
+                f"Document compaction: adopted {report.adopted}, purged {report.purged}, "
+                f"removed {report.removed_files} files, recompressed {report.recompressed}, "
+                f"freed {report.freed_bytes} bytes"
+            )
+        return report
+    
+    async def _remove_if_older(self, key: str, cutoff: float) -> int:
+        """Delete blob `key` unless it was written after `cutoff`; returns bytes freed"""
+        info = await self.store.stat(key)
+        if info is None or info.modified >= cutoff:
+            return 0
+        await self.store.delete(key)
+        return info.size
+    
+    async def _adopt_file(self, legacy_path: str) -> Optional[StoredDocument]:
+        """Move a legacy upload and its variants into the blob store under its digest key"""
+        stored = await asyncio.to_thread(_identify_legacy, legacy_path)
+        if stored is None:
+            return None
+        for source, key in zip(_blob_files(legacy_path), _blob_files(stored.path)):
+            if os.path.exists(source):
+                content_type = "image/jpeg" if key.endswith((PREVIEW_SUFFIX, THUMBNAIL_SUFFIX)) else stored.content_type
+                await self.store.put_file(key, source, content_type)
+        return stored
+    
+    async def _adopt_legacy(self, report: CompactionReport) -> CompactionReport:
+        """Give uploads stored before content addressing a digest key and a blob.
+        
+        Rows still waiting for the pipeline are left for a later pass so the
+        file is not moved while it is being read. Every app process runs a
+        compactor, so each row is claimed (as the pipeline does) before its
+        file is moved.
+        """
+        adopted = 0
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(VerificationRequest.id, VerificationRequest.file_path, VerificationRequest.processing_status,
+                       VerificationRequest.clean_path, VerificationRequest.preview_path,
+                       VerificationRequest.thumbnail_path).where(
+                    VerificationRequest.file_path.notlike(f"{OBJECTS_DIR}/%"),
+                    or_(VerificationRequest.processing_status.is_(None),
+                        VerificationRequest.processing_status.notin_(["pending", "processing", "purged", "missing"]))
+                ).limit(BATCH_SIZE)
+            )
+            for request_id, legacy_path, processing_status, clean, preview_path, thumbnail_path in result.all():
+                if is_object_key(legacy_path):
+                    continue
+                claimed = await db.execute(
+                    update(VerificationRequest).where(
+                        VerificationRequest.id == request_id,
+                        VerificationRequest.file_path == legacy_path,
+                        VerificationRequest.processing_status.is_not_distinct_from(processing_status)
+                    ).values(processing_status="processing", processing_started_at=datetime.utcnow())
+                )
+                await db.commit()
+                if claimed.rowcount != 1:
+                    continue
+                
+                stored = await self._adopt_file(legacy_path)
+                if stored is None:
+                    logger.warning(f"Verification document {request_id} not found at {legacy_path}")
+                    await db.execute(
+                        update(VerificationRequest).where(VerificationRequest.id == request_id).values(
+                            processing_status="missing"
+                        )
+                    )
+                    await db.commit()
+                    continue
+                values = {
+                    "file_path": stored.path,
+                    "file_sha256": stored.sha256,
+                    "content_type": stored.content_type,
+                    "processing_status": processing_status,
+                }
+                if clean:
+                    values["clean_path"] = clean_path(stored.path)
+                if preview_path:
+                    values["preview_path"] = variant_path(stored.path, PREVIEW_SUFFIX)
+                if thumbnail_path:
+                    values["thumbnail_path"] = variant_path(stored.path, THUMBNAIL_SUFFIX)
+                await db.execute(
+                    update(VerificationRequest).where(VerificationRequest.id == request_id).values(**values)
+                )
+                await acquire(db, stored)
+                # Commit per file: the move has already happened
+                await db.commit()
+                adopted += 1
+        return report._replace(adopted=report.adopted + adopted)
+    
+    async def _purge_expired(self, report: CompactionReport) -> CompactionReport:
+        """Release the documents of requests rejected more than retention_days ago"""
+        if self.retention_days <= 0:
+            return report
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        purged = 0
+        async with AsyncSessionLocal() as db:
+            not_purged = or_(VerificationRequest.processing_status.is_(None),
+                             VerificationRequest.processing_status != "purged")
+            result = await db.execute(
+                select(VerificationRequest.id, VerificationRequest.file_sha256).where(
+                    VerificationRequest.status == "rejected",
+                    VerificationRequest.updated_at < cutoff,
+                    VerificationRequest.file_sha256.isnot(None),
+                    not_purged
+                ).limit(BATCH_SIZE)
+            )
+            for request_id, sha256 in result.all():
+                # Only the pass whose update took effect releases the blob,
+                # so concurrent compactors cannot release it twice
+                marked = await db.execute(
+                    update(VerificationRequest).where(VerificationRequest.id == request_id, not_purged).values(
+                        processing_status="purged", clean_path=None, preview_path=None, thumbnail_path=None
+                    )
+                )
+                if marked.rowcount == 1:
+                    await release(db, sha256)
+                    purged += 1
+            await db.commit()
+        return report._replace(purged=report.purged + purged)
+    
+    async def _collect_garbage(self, report: CompactionReport) -> CompactionReport:
+        """Delete unreferenced blobs, then any stored object or upload file that has no blob"""
+        cutoff = time.time() - self.orphan_grace
+        released_before = datetime.utcnow() - timedelta(seconds=self.orphan_grace)
+        removed = freed = 0
+        
+        async with AsyncSessionLocal() as db:
+            candidates = select(DocumentBlob.sha256).where(
+                DocumentBlob.ref_count <= 0,
+                DocumentBlob.released_at < released_before
+            ).limit(BATCH_SIZE)
+            # ref_count is checked again by the DELETE itself and only rows it
+            # actually removed come back, so a blob revived by a concurrent
+            # re-upload keeps its files
+            result = await db.execute(
+                delete(DocumentBlob).where(
+                    DocumentBlob.sha256.in_(candidates),
+                    DocumentBlob.ref_count <= 0
+                ).returning(DocumentBlob.sha256, DocumentBlob.content_type)
+            )
+            dead = result.all()
+            await db.commit()
+        
+        for sha256, content_type in dead:
+            for key in _blob_keys(sha256, content_type):
+                size = await self._remove_if_older(key, cutoff)
+                if size:
+                    removed += 1
+                    freed += size
+        
+        # Orphans: objects left by crashed uploads or blobs deleted elsewhere,
+        # one page of the store per pass
+        page = await self.store.list(f"{OBJECTS_DIR}/", start_after=self._scan_after, limit=ORPHAN_SCAN_PAGE)
+        self._scan_after = page[-1].key if len(page) >= ORPHAN_SCAN_PAGE else ""
+        stored: Dict[str, List[str]] = {}
+        for info in page:
+            if info.modified < cutoff:
+                stored.setdefault(object_digest(info.key), []).append(info.key)
+        digests = list(stored)
+        live: Dict[str, str] = {}
+        superseded: List[Tuple[str, str, str]] = []
+        async with AsyncSessionLocal() as db:
+            for start in range(0, len(digests), BATCH_SIZE):
+                chunk = digests[start:start + BATCH_SIZE]
+                result = await db.execute(
+                    select(DocumentBlob.sha256, DocumentBlob.path, DocumentBlob.content_type).where(
+                        DocumentBlob.sha256.in_(chunk)
+                    )
+                )
+                for sha256, path, content_type in result.all():
+                    live[sha256] = path
+                    # Originals replaced by their recompressed copy
+                    original = object_key(sha256, content_type)
+                    if path != original and original in stored[sha256]:
+                        superseded.append((sha256, original, path))
+            
+            # Rows that still name an original committed before recompression finished
+            for sha256, original, path in superseded:
+                await db.execute(
+                    update(VerificationRequest).where(
+                        VerificationRequest.file_sha256 == sha256,
+                        VerificationRequest.file_path == original
+                    ).values(file_path=path)
+                )
+            await db.commit()
+            
+            loose = await asyncio.to_thread(_scan_loose, self.directory, cutoff)
+            referenced: Set[str] = set()
+            for start in range(0, len(loose), BATCH_SIZE):
+                chunk = loose[start:start + BATCH_SIZE]
+                result = await db.execute(
+                    select(VerificationRequest.file_path, VerificationRequest.clean_path,
+                           VerificationRequest.preview_path, VerificationRequest.thumbnail_path).where(or_(
+                        VerificationRequest.file_path.in_(chunk),
+                        VerificationRequest.clean_path.in_(chunk),
+                        VerificationRequest.preview_path.in_(chunk),
+                        VerificationRequest.thumbnail_path.in_(chunk)
+                    ))
+                )
+                for row in result.all():
+                    referenced.update(path for path in row if path)
+        
+        orphans = [key for digest, keys in stored.items() if digest not in live for key in keys]
+        # A re-upload refreshes the original's modification time, so one that
+        # was put back meanwhile is still newer than the cutoff
+        orphans += [original for _, original, _ in superseded]
+        for key in orphans:
+            size = await self._remove_if_older(key, cutoff)
+            if size:
+                removed += 1
+                freed += size
+        for path in loose:
+            if path.endswith(TEMP_SUFFIX) or path not in referenced:
+                size = await asyncio.to_thread(_remove_local_if_older, path, cutoff)
+                if size:
+                    removed += 1
+                    freed += size
+        swept, swept_bytes = await asyncio.to_thread(_sweep_work_dirs, self.directory, cutoff)
+        removed += swept
+        freed += swept_bytes
+        
+        return report._replace(removed_files=report.removed_files + removed, freed_bytes=report.freed_bytes + freed)
+    
+    async def _recompress(self, report: CompactionReport) -> CompactionReport:
+        """Store a smaller lossless copy of PNG originals whose requests are all settled.
+        
+        The copy goes to its own <sha256>.packed.png key and the blob and its
+        requests are pointed at it; the original object is left in place
+        and removed by garbage collection once older than the grace period.
+        """
+        if not self.pipeline.available or self.recompress_after_days <= 0:
+            return report
+        created_before = datetime.utcnow() - timedelta(days=self.recompress_after_days)
+        recompressed = 0
+        
+        async with AsyncSessionLocal() as db:
+            pending = select(VerificationRequest.id).where(
+                VerificationRequest.file_sha256 == DocumentBlob.sha256,
+                VerificationRequest.status == "pending"
+            ).exists()
+            result = await db.execute(
+                select(DocumentBlob.sha256, DocumentBlob.path, DocumentBlob.content_type).where(
+                    DocumentBlob.content_type == "image/png",
+                    DocumentBlob.recompressed_at.is_(None),
+                    DocumentBlob.ref_count > 0,
+                    DocumentBlob.created_at < created_before,
+                    ~pending
+                ).limit(BATCH_SIZE)
+            )
+            for sha256, path, content_type in result.all():
+                packed_key = variant_path(object_key(sha256, content_type), PACKED_SUFFIX)
+                packed_size = None
+                try:
+                    async with self.store.local_copy(path) as local_path:
+                        packed_path = variant_path(local_path, PACKED_SUFFIX)
+                        packed_size = await self.pipeline.run(recompress_png, local_path, packed_path)
+                        if packed_size is not None:
+                            await self.store.put_file(packed_key, packed_path, "image/png")
+                except Exception as e:
+                    logger.warning(f"Could not recompress blob {sha256}: {str(e)}")
+                    packed_size = None
+                
+                values = {"recompressed_at": datetime.utcnow()}
+                if packed_size is not None:
+                    values.update(path=packed_key, stored_size=packed_size)
+                # Only if no re-upload reset the blob meanwhile
+                updated = await db.execute(
+                    update(DocumentBlob).where(and_(
+                        DocumentBlob.sha256 == sha256,
+                        DocumentBlob.path == path,
+                        DocumentBlob.recompressed_at.is_(None)
+                    )).values(**values)
+                )
+                if packed_size is not None and updated.rowcount:
+                    await db.execute(
+                        update(VerificationRequest).where(
+                            VerificationRequest.file_sha256 == sha256,
+                            VerificationRequest.file_path == path
+                        ).values(file_path=packed_key)
+                    )
+                    recompressed += 1
+                await db.commit()
+        
+        return report._replace(recompressed=report.recompressed + recompressed)
+
+# Singleton instance
+document_compactor = DocumentCompactor(
+    settings.verification_upload_dir,
+    blob_store,
+    document_pipeline,
+    interval=settings.document_compaction_interval,
+    orphan_grace=settings.document_orphan_grace,
+    retention_days=settings.document_retention_days,
+    recompress_after_days=settings.document_recompress_after_days
+)
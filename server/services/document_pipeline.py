@@ -0,0 +1,514 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from datetime import datetime, timedelta
+from typing import Callable, NamedTuple, Optional, Set, Tuple, TypeVar
+
+from sqlalchemy import and_, or_, select, update
+
+from core.config import settings
+from database import AsyncSessionLocal
+from models.models import VerificationRequest
+from services.blob_store import BlobStore, blob_store
+from services.document_storage import EXTENSIONS, is_object_key, sniff_content_type
+
+try:
+    from PIL import Image, ImageOps, PngImagePlugin
+except ImportError:  # optional, documents are stored but not processed without it
+    Image = ImageOps = PngImagePlugin = None
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CONTENT_TYPES = {extension: content_type for content_type, extension in EXTENSIONS.items()}
+
+PREVIEW_SUFFIX = ".preview.jpg"
+THUMBNAIL_SUFFIX = ".thumb.jpg"
+PACKED_SUFFIX = ".packed.png"  # losslessly recompressed copy of a PNG original
+CLEAN_SUFFIX = ".clean"  # + the original's extension: the original without metadata
+
+# JPEG segments kept in the metadata-free copy: JFIF, ICC profile, Adobe
+# colour transform. EXIF/XMP (APP1), other APPn and comments are dropped.
+JPEG_KEPT_SEGMENTS = {0xE0: None, 0xE2: b"ICC_PROFILE\0", 0xEE: None}
+# PNG chunks that carry metadata rather than image data
+PNG_METADATA_CHUNKS = frozenset({b"tEXt", b"zTXt", b"iTXt", b"eXIf", b"tIME"})
+# GIF application extensions needed for playback (loop count)
+GIF_KEPT_APPLICATIONS = (b"NETSCAPE2.0", b"ANIMEXTS1.0")
+
+# PNG chunks recompress_png reproduces; files with any other chunk are left alone
+PNG_KNOWN_CHUNKS = frozenset({b"IHDR", b"PLTE", b"IDAT", b"IEND", b"tRNS", b"iCCP", b"pHYs",
+                              b"tEXt", b"zTXt", b"iTXt"})
+
+
+class DocumentRejected(Exception):
+    """The file is not a usable document image"""
+
+
+class ProcessedDocument(NamedTuple):
+    width: int
+    height: int
+    clean_path: str
+    preview_path: str
+    thumbnail_path: str
+
+
+def variant_path(original_path: str, suffix: str) -> str:
+    """Path (or blob key) of a derived variant next to the original.
+    
+    Everything after the first dot of the file name is replaced, so the
+    variants of objects/aa/bb/<sha>.png and of its <sha>.packed.png copy
+    are the same keys.
+    """
+    directory, name = os.path.split(original_path)
+    return os.path.join(directory, name.split(".", 1)[0] + suffix)
+
+
+def clean_path(original_path: str) -> str:
+    """Path (or blob key) of the metadata-free copy of an original"""
+    return variant_path(original_path, CLEAN_SUFFIX + os.path.splitext(original_path)[1])
+
+
+def _orientation_exif(orientation: int) -> bytes:
+    """APP1 payload of an EXIF block holding nothing but the orientation tag"""
+    return (b"Exif\0\0MM\0\x2a\0\0\0\x08"  # big-endian TIFF header, IFD at 8
+            + b"\0\x01\x01\x12\0\x03\0\0\0\x01" + orientation.to_bytes(2, "big") + b"\0\0"
+            + b"\0\0\0\0")  # no next IFD
+
+
+def _strip_jpeg(data: bytes, orientation: int) -> bytes:
+    if data[:2] != b"\xff\xd8":
+        raise DocumentRejected("Malformed JPEG")
+    kept = [data[:2]]
+    position = 2
+    while position + 4 <= len(data):
+        if data[position] != 0xFF:
+            raise DocumentRejected("Malformed JPEG")
+        marker = data[position + 1]
+        if marker == 0xFF:  # fill byte
+            position += 1
+            continue
+        if marker == 0xDA:
+            # Start of scan: entropy-coded data follows, copied as is
+            break
+        length = int.from_bytes(data[position + 2:position + 4], "big")
+        segment = data[position:position + 2 + length]
+        if not 0xE0 <= marker <= 0xEF and marker != 0xFE:
+            kept.append(segment)
+        elif marker in JPEG_KEPT_SEGMENTS:
+            signature = JPEG_KEPT_SEGMENTS[marker]
+            if signature is None or segment[4:4 + len(signature)] == signature:
+                kept.append(segment)
+        position += 2 + length
+    if orientation != 1:
+        # Keep the rotation the viewer must apply, without the rest of the EXIF
+        payload = _orientation_exif(orientation)
+        app1 = b"\xff\xe1" + (len(payload) + 2).to_bytes(2, "big") + payload
+        index = 2 if len(kept) > 1 and kept[1][:2] == b"\xff\xe0" else 1
+        kept.insert(index, app1)
+    return b"".join(kept) + data[position:]
+
+
+def _strip_png(data: bytes) -> bytes:
+    kept = [data[:8]]
+    position = 8
+    while position + 8 <= len(data):
+        length = int.from_bytes(data[position:position + 4], "big")
+        chunk_type = data[position + 4:position + 8]
+        end = position + 12 + length
+        if chunk_type not in PNG_METADATA_CHUNKS:
+            kept.append(data[position:end])
+        position = end
+        if chunk_type == b"IEND":
+            break
+    return b"".join(kept)
+
+
+def _gif_sub_blocks_end(data: bytes, position: int) -> int:
+    while data[position]:
+        position += data[position] + 1
+    return position + 1
+
+
+def _strip_gif(data: bytes) -> bytes:
+    position = 13
+    if data[10] & 0x80:
+        position += 3 * 2 ** ((data[10] & 0x07) + 1)
+    kept = [data[:position]]
+    while position < len(data):
+        block = data[position]
+        if block == 0x3B:  # trailer
+            kept.append(data[position:position + 1])
+            break
+        if block == 0x2C:  # image descriptor, optional local colour table, LZW data
+            start = position
+            flags = data[position + 9]
+            position += 10
+            if flags & 0x80:
+                position += 3 * 2 ** ((flags & 0x07) + 1)
+            position = _gif_sub_blocks_end(data, position + 1)
+            kept.append(data[start:position])
+        elif block == 0x21:
+            start = position
+            label = data[position + 1]
+            position = _gif_sub_blocks_end(data, position + 2)
+            if label == 0xFE:
+                continue  # comment
+            if label == 0xFF and data[start + 3:start + 14] not in GIF_KEPT_APPLICATIONS:
+                continue  # XMP and other application data
+            kept.append(data[start:position])
+        else:
+            raise DocumentRejected("Malformed GIF")
+    return b"".join(kept)
+
+
+def write_clean_copy(path: str, target_path: str, content_type: str, orientation: int = 1):
+    """Copy an original without its metadata (EXIF, GPS, XMP, comments, text).
+    
+    Only metadata segments are removed; the image data is copied byte for
+    byte, so nothing is re-encoded. A JPEG keeps its EXIF orientation.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        if content_type == "image/jpeg":
+            data = _strip_jpeg(data, orientation)
+        elif content_type == "image/png":
+            data = _strip_png(data)
+        elif content_type == "image/gif":
+            data = _strip_gif(data)
+    except IndexError:
+        raise DocumentRejected("Truncated image file")
+    temp_path = f"{target_path}.part"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, target_path)
+
+
+def _save_variant(image, path: str, max_side: int):
+    variant = image.copy()
+    variant.thumbnail((max_side, max_side), Image.LANCZOS)
+    temp_path = f"{path}.part"
+    # Saved without exif/icc/comment, so no metadata from the upload survives
+    variant.save(temp_path, "JPEG", quality=85, optimize=True)
+    os.replace(temp_path, path)
+
+
+def _flatten(image):
+    """RGB copy with transparency composited onto white"""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def process_document(path: str, preview_size: int, thumbnail_size: int,
+                     max_pixels: int, min_dimension: int) -> ProcessedDocument:
+    """Validate an uploaded image and write its derived files.
+    
+    Runs in a worker process. The original file is left byte-for-byte as
+    uploaded (its digest is the record of what the user submitted) and is
+    not served; admins get a copy without metadata instead. The preview and
+    thumbnail JPEGs are rotated per EXIF orientation and carry no metadata.
+    If all three already exist next to it (a re-submitted document on local
+    storage) only its header is read.
+    """
+    with open(path, "rb") as f:
+        content_type = sniff_content_type(f.read(16))
+    if content_type is None:
+        raise DocumentRejected("Unrecognised file signature")
+    
+    clean = clean_path(path)
+    preview_path = variant_path(path, PREVIEW_SUFFIX)
+    thumbnail_path = variant_path(path, THUMBNAIL_SUFFIX)
+    
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+            if all(os.path.exists(variant) for variant in (clean, preview_path, thumbnail_path)):
+                return ProcessedDocument(width, height, clean, preview_path, thumbnail_path)
+            if width * height > max_pixels:
+                raise DocumentRejected(f"Image too large: {width}x{height}")
+            if min(width, height) < min_dimension:
+                raise DocumentRejected(f"Image too small: {width}x{height}")
+            
+            orientation = image.getexif().get(0x0112, 1)
+            # Let the JPEG decoder downscale while decoding; the preview never needs full size
+            image.draft("RGB", (preview_size, preview_size))
+            image = ImageOps.exif_transpose(image)
+            image = _flatten(image)
+    except (Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise DocumentRejected(f"Unreadable image: {str(e)}")
+    
+    _save_variant(image, preview_path, preview_size)
+    _save_variant(image, thumbnail_path, thumbnail_size)
+    write_clean_copy(path, clean, content_type, orientation if orientation in range(1, 9) else 1)
+    
+    return ProcessedDocument(width, height, clean, preview_path, thumbnail_path)
+
+
+def _png_chunks(path: str) -> Tuple[int, Set[bytes]]:
+    """IHDR bit depth and the chunk types of a PNG file"""
+    chunk_types: Set[bytes] = set()
+    bit_depth = 0
+    with open(path, "rb") as f:
+        f.seek(8)
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            length = int.from_bytes(header[:4], "big")
+            chunk_type = header[4:]
+            chunk_types.add(chunk_type)
+            if chunk_type == b"IHDR":
+                bit_depth = f.read(length)[8]
+                f.seek(4, os.SEEK_CUR)
+            else:
+                f.seek(length + 4, os.SEEK_CUR)
+            if chunk_type == b"IEND":
+                break
+    return bit_depth, chunk_types
+
+
+def recompress_png(path: str, packed_path: str) -> Optional[int]:
+    """Write a smaller, lossless re-encoding of a PNG to `packed_path`.
+    
+    The original is never modified; its bytes are what the digest names.
+    Animated and 16-bit images and files with chunks Pillow would not carry
+    over are skipped, text chunks are kept, and the result is decoded again
+    and compared pixel for pixel. Returns the new size, or None when nothing
+    was written.
+    """
+    bit_depth, chunk_types = _png_chunks(path)
+    if bit_depth == 16 or not chunk_types <= PNG_KNOWN_CHUNKS:
+        return None
+    
+    temp_path = f"{packed_path}.part"
+    try:
+        with Image.open(path) as image:
+            if getattr(image, "is_animated", False):
+                return None
+            image.load()
+            pnginfo = PngImagePlugin.PngInfo()
+            for key, value in image.text.items():
+                pnginfo.add_text(key, value)
+            options = {"optimize": True, "pnginfo": pnginfo}
+            if "dpi" in image.info:
+                options["dpi"] = image.info["dpi"]
+            image.save(temp_path, "PNG", **options)
+            if os.path.getsize(temp_path) >= os.path.getsize(path):
+                return None
+            
+            with Image.open(temp_path) as packed:
+                packed.load()
+                if (packed.mode != image.mode or packed.size != image.size
+                        or packed.getpalette() != image.getpalette()
+                        or packed.info.get("transparency") != image.info.get("transparency")
+                        or packed.tobytes() != image.tobytes()):
+                    return None
+        os.replace(temp_path, packed_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+    return os.path.getsize(packed_path)
+
+
+class DocumentPipeline:
+    """Post-upload processing of verification documents on a process pool.
+    
+    The upload handler only queues the request id; decoding and resizing
+    happen in worker processes so they neither block the event loop nor add
+    to upload latency. Workers read a local copy of the stored blob and the
+    variants are put back into the blob store. Results are written to the
+    verification request row.
+    
+    Several app processes can run a pipeline against the same database, so
+    a document is claimed (pending -> processing) before any work is done
+    and only the process whose claim succeeded handles it. Rows still
+    pending at startup, or claimed longer than `processing_timeout` ago by
+    a process that died, are picked up again.
+    """
+    
+    def __init__(self, store: BlobStore, workers: int, preview_size: int, thumbnail_size: int,
+                 max_pixels: int, min_dimension: int, processing_timeout: float):
+        self.store = store
+        self.workers = workers
+        self.processing_timeout = timedelta(seconds=processing_timeout)
+        self._process_file = partial(
+            process_document,
+            preview_size=preview_size,
+            thumbnail_size=thumbnail_size,
+            max_pixels=max_pixels,
+            min_dimension=min_dimension
+        )
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+    
+    @property
+    def available(self) -> bool:
+        return Image is not None
+    
+    async def start(self):
+        if not self.available:
+            logger.warning("Pillow is not installed, verification documents will not be processed")
+        else:
+            # spawn: the parent has running threads, which fork does not copy safely
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(VerificationRequest.id, VerificationRequest.file_path).where(self._claimable())
+            )
+            pending = result.all()
+        for request_id, file_path in pending:
+            self.submit(request_id, file_path)
+        logger.info(f"Document pipeline started ({self.workers} workers, {len(pending)} queued)")
+    
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        logger.info("Document pipeline stopped")
+    
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """Run another CPU-heavy document job on the same process pool"""
+        if self._executor is None:
+            raise RuntimeError("Document pipeline is not running")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+    
+    def submit(self, request_id: int, file_path: str):
+        """Queue a stored upload for processing; returns immediately"""
+        task = asyncio.create_task(self._handle(request_id, file_path), name=f"document-{request_id}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    def _claimable(self):
+        """Rows no live worker is processing"""
+        stale_before = datetime.utcnow() - self.processing_timeout
+        return or_(
+            VerificationRequest.processing_status == "pending",
+            and_(
+                VerificationRequest.processing_status == "processing",
+                or_(VerificationRequest.processing_started_at.is_(None),
+                    VerificationRequest.processing_started_at < stale_before)
+            )
+        )
+    
+    async def _claim(self, request_id: int) -> bool:
+        """Mark a document as being processed here; False if another worker has it"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(VerificationRequest).where(
+                    VerificationRequest.id == request_id,
+                    self._claimable()
+                ).values(processing_status="processing", processing_started_at=datetime.utcnow())
+            )
+            await db.commit()
+        return result.rowcount == 1
+    
+    async def _processed_copy(self, request_id: int, key: str) -> Optional[ProcessedDocument]:
+        """Result of an earlier request for the same blob whose variants are still stored"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(VerificationRequest.image_width, VerificationRequest.image_height, VerificationRequest.clean_path,
+                       VerificationRequest.preview_path, VerificationRequest.thumbnail_path).where(
+                    VerificationRequest.file_path == key,
+                    VerificationRequest.processing_status == "ready",
+                    VerificationRequest.id != request_id
+                ).limit(1)
+            )
+            row = result.first()
+        if row is None or not row.clean_path or not row.preview_path or not row.thumbnail_path:
+            return None
+        for variant in (row.clean_path, row.preview_path, row.thumbnail_path):
+            if await self.store.stat(variant) is None:
+                return None
+        return ProcessedDocument(row.image_width, row.image_height, row.clean_path, row.preview_path,
+                                 row.thumbnail_path)
+    
+    async def _process(self, key: str) -> ProcessedDocument:
+        loop = asyncio.get_running_loop()
+        if not is_object_key(key):
+            # Legacy upload, still on local disk until the compactor adopts it
+            return await loop.run_in_executor(self._executor, self._process_file, key)
+        async with self.store.local_copy(key) as path:
+            result = await loop.run_in_executor(self._executor, self._process_file, path)
+            clean_key = clean_path(key)
+            preview_key = variant_path(key, PREVIEW_SUFFIX)
+            thumbnail_key = variant_path(key, THUMBNAIL_SUFFIX)
+            await self.store.put_file(clean_key, result.clean_path, CONTENT_TYPES[os.path.splitext(key)[1]])
+            await self.store.put_file(preview_key, result.preview_path, "image/jpeg")
+            await self.store.put_file(thumbnail_key, result.thumbnail_path, "image/jpeg")
+        return result._replace(clean_path=clean_key, preview_path=preview_key, thumbnail_path=thumbnail_key)
+    
+    async def _handle(self, request_id: int, file_path: str):
+        try:
+            if not await self._claim(request_id):
+                return
+        except Exception as e:
+            logger.error(f"Error claiming verification document {request_id}: {str(e)}")
+            return
+        
+        if self._executor is None:
+            await self._record(request_id, processing_status="skipped")
+            return
+        
+        try:
+            result = await self._processed_copy(request_id, file_path)
+            if result is None:
+                result = await self._process(file_path)
+        except DocumentRejected as e:
+            logger.warning(f"Verification document {request_id} rejected: {str(e)}")
+            await self._record(request_id, processing_status="invalid", processing_error=str(e))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error processing verification document {request_id}: {str(e)}")
+            await self._record(request_id, processing_status="failed", processing_error=str(e))
+        else:
+            await self._record(
+                request_id,
+                processing_status="ready",
+                processing_error=None,
+                image_width=result.width,
+                image_height=result.height,
+                clean_path=result.clean_path,
+                preview_path=result.preview_path,
+                thumbnail_path=result.thumbnail_path
+            )
+    
+    async def _record(self, request_id: int, **values):
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(VerificationRequest).where(VerificationRequest.id == request_id).values(**values)
+                )
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Error saving processing result for verification document {request_id}: {str(e)}")
+
+
+# Singleton instance
+document_pipeline = DocumentPipeline(
+    blob_store,
+    workers=settings.document_workers,
+    preview_size=settings.document_preview_size,
+    thumbnail_size=settings.document_thumbnail_size,
+    max_pixels=settings.document_max_pixels,
+    min_dimension=settings.document_min_dimension,
+    processing_timeout=settings.document_processing_timeout
+)
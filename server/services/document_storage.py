@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from fastapi import UploadFile
+from sqlalchemy import case, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import dialect_insert
+from models.models import DocumentBlob
+from services.blob_store import blob_store
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Leading bytes of the accepted image formats
+IMAGE_SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": "image/png",
+    b"\xff\xd8\xff": "image/jpeg",
+    b"GIF87a": "image/gif",
+    b"GIF89a": "image/gif",
+}
+
+EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/gif": ".gif",
+}
+
+# Content-addressed blobs are stored under objects/<aa>/<bb>/<sha256><ext>;
+# uploads are spooled in the upload dir first
+OBJECTS_DIR = "objects"
+TEMP_SUFFIX = ".part"
+
+
+class UploadTooLargeError(Exception):
+    """Raised as soon as an upload crosses the size limit"""
+
+
+class UnsupportedContentError(Exception):
+    """Raised when the first bytes do not look like an accepted image"""
+
+
+class StoredDocument(NamedTuple):
+    path: str  # blob store key
+    size: int
+    sha256: str
+    content_type: str
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    for signature, content_type in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+def object_key(sha256: str, content_type: str) -> str:
+    """Key of the blob with this digest; two fan-out levels keep directories small"""
+    return f"{OBJECTS_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}{EXTENSIONS[content_type]}"
+
+
+def object_digest(key: str) -> str:
+    """Digest part of an object (or derived variant) key"""
+    return key.rsplit("/", 1)[-1].split(".", 1)[0]
+
+
+def is_object_key(path: str) -> bool:
+    return path.startswith(OBJECTS_DIR + "/")
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _open_temp(directory: str) -> tuple:
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{uuid.uuid4()}{TEMP_SUFFIX}")
+    return temp_path, open(temp_path, "xb")
+
+
+def _finish(handle):
+    handle.flush()
+    os.fsync(handle.fileno())
+    handle.close()
+
+
+def _discard(handle, temp_path: str):
+    if not handle.closed:
+        handle.close()
+    try:
+        os.unlink(temp_path)
+    except FileNotFoundError:
+        pass
+
+
+async def save_upload(upload: UploadFile, directory: str, max_size: int) -> StoredDocument:
+    """Stream an upload into the content-addressed store chunk by chunk.
+    
+    The content type is taken from the first bytes, the SHA-256 is computed
+    on the way through and the size limit is enforced per chunk, so memory
+    use stays at one chunk regardless of file size. Data goes to a hidden
+    temp file that is handed to the blob store under its digest key only once
+    complete, so a re-submitted document ends up as the same blob.
+    """
+    temp_path, handle = await asyncio.to_thread(_open_temp, directory)
+    digest = hashlib.sha256()
+    size = 0
+    content_type = None
+    
+    try:
+        while True:
+            chunk = await upload.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if content_type is None:
+                content_type = sniff_content_type(chunk)
+                if content_type is None:
+                    raise UnsupportedContentError(f"Unrecognised file signature {chunk[:8]!r}")
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLargeError(f"Upload exceeds {max_size} bytes")
+            digest.update(chunk)
+            await asyncio.to_thread(handle.write, chunk)
+        
+        if content_type is None:
+            raise UnsupportedContentError("Empty upload")
+        
+        sha256 = digest.hexdigest()
+        key = object_key(sha256, content_type)
+        await asyncio.to_thread(_finish, handle)
+        # Also replaces an existing copy of the same content; the fresh
+        # modification time keeps the compaction job from deleting it while
+        # the new reference is committed
+        await blob_store.put_file(key, temp_path, content_type)
+    except BaseException:
+        await asyncio.to_thread(_discard, handle, temp_path)
+        raise
+    
+    return StoredDocument(path=key, size=size, sha256=sha256, content_type=content_type)
+
+
+async def acquire(db: AsyncSession, stored: StoredDocument):
+    """Count one more reference to a stored blob; call before committing the referencing row"""
+    stmt = dialect_insert(db)(DocumentBlob).values(
+        sha256=stored.sha256,
+        path=stored.path,
+        content_type=stored.content_type,
+        size=stored.size,
+        stored_size=stored.size,
+        ref_count=1,
+        created_at=datetime.utcnow()
+    )
+    # The blob was just rewritten with the uploaded bytes, so any recompression is undone
+    stmt = stmt.on_conflict_do_update(index_elements=[DocumentBlob.sha256], set_={
+        "ref_count": DocumentBlob.ref_count + 1,
+        "path": stmt.excluded.path,
+        "stored_size": stmt.excluded.stored_size,
+        "released_at": None,
+        "recompressed_at": None,
+    })
+    await db.execute(stmt)
+
+
+async def release(db: AsyncSession, sha256: str):
+    """Drop one reference; the compaction job removes blobs nobody references"""
+    await db.execute(
+        update(DocumentBlob).where(DocumentBlob.sha256 == sha256).values(
+            ref_count=DocumentBlob.ref_count - 1,
+            released_at=case((DocumentBlob.ref_count <= 1, datetime.utcnow()), else_=DocumentBlob.released_at)
+        )
+    )
@@ -0,0 +1,64 @@
+import logging
+from typing import Optional
+
+import httpx
+
+from core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class SharedHTTPClient:
+    """Owns the process-wide httpx.AsyncClient used for all Wirebit traffic.
+    
+    The client is created and closed by the app lifespan so every request
+    reuses the same keep-alive connection pool.
+    """
+    
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    async def start(self):
+        """Create the pooled client"""
+        if self._client is not None:
+            return
+        
+        http2 = settings.http2_enabled and _http2_available()
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+                keepalive_expiry=settings.http_keepalive_expiry
+            ),
+            timeout=httpx.Timeout(settings.http_timeout, connect=settings.http_connect_timeout)
+        )
+        logger.info(f"Shared HTTP client started (http2={http2}, max_connections={settings.http_max_connections})")
+    
+    async def close(self):
+        """Close the pool and release its connections"""
+        if self._client is None:
+            return
+        await self._client.aclose()
+        self._client = None
+        logger.info("Shared HTTP client closed")
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("Shared HTTP client is not started")
+        return self._client
+
+
+# Singleton instance
+http_client = SharedHTTPClient()
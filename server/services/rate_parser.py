@@ -0,0 +1,94 @@
+import io
+import logging
+import xml.etree.ElementTree as ET
+from types import MappingProxyType
+from typing import List, Mapping, NamedTuple, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Child elements of <item> the rate table needs, everything else is skipped
+ITEM_FIELDS = frozenset({"from", "to", "in", "out", "amount", "minamount", "maxamount"})
+
+
+class RateEntry(NamedTuple):
+    rate: float
+    min: float
+    max: float
+    reserve: float
+
+
+DEFAULT_RATE = RateEntry(rate=1, min=10, max=10000, reserve=0)
+
+RateTable = Mapping[str, RateEntry]
+
+
+class RatesDiff(NamedTuple):
+    added: List[str]
+    removed: List[str]
+    changed: List[str]
+    
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def _leading_number(text: Optional[str], default: float) -> float:
+    """Min/max come as '10 USDT', keep the numeric part"""
+    if not text:
+        return default
+    return float(text.split()[0])
+
+
+def _build_entry(fields: dict) -> RateEntry:
+    in_amount = float(fields["in"])
+    out_amount = float(fields["out"])
+    amount = fields.get("amount")
+    return RateEntry(
+        rate=out_amount / in_amount if in_amount > 0 else 1,
+        min=_leading_number(fields.get("minamount"), 0),
+        max=_leading_number(fields.get("maxamount"), 999999),
+        reserve=float(amount) if amount is not None else 0
+    )
+
+
+def parse_rates(content: bytes) -> RateTable:
+    """Build the rate table from the XML feed in a single streaming pass.
+    
+    Elements are cleared as soon as their <item> is consumed, so peak memory
+    stays flat no matter how large the feed grows.
+    """
+    rates = {}
+    fields = {}
+    root = None
+    skipped = 0
+    
+    for event, elem in ET.iterparse(io.BytesIO(content), events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            continue
+        
+        tag = elem.tag
+        if tag in ITEM_FIELDS:
+            fields[tag] = elem.text
+        elif tag == "item":
+            try:
+                rates[f"{fields['from']}_{fields['to']}"] = _build_entry(fields)
+            except (KeyError, TypeError, ValueError):
+                skipped += 1
+            fields = {}
+            # Drop the finished item from the tree
+            root.clear()
+    
+    if skipped:
+        logger.warning(f"Skipped {skipped} malformed items in rates feed")
+    
+    return MappingProxyType(rates)
+
+
+def diff_rates(old: RateTable, new: RateTable) -> RatesDiff:
+    """Report which currency pairs appeared, disappeared or changed between snapshots"""
+    added = [key for key in new if key not in old]
+    removed = [key for key in old if key not in new]
+    changed = [key for key, entry in new.items() if key in old and old[key] != entry]
+    return RatesDiff(added=added, removed=removed, changed=changed)
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from typing import Optional
+
+from core.config import settings
+from services.wirebit_client import WirebitClient, wirebit_client
+
+
+logger = logging.getLogger(__name__)
+
+
+class RateRefresher:
+    """Keeps the Wirebit rate table and directions catalog fresh in the background.
+    
+    Request handlers always read the last published snapshot, so they never
+    wait on the XML feed; a failed refresh simply leaves the old one in place.
+    """
+    
+    def __init__(self, client: WirebitClient, interval: float):
+        self.client = client
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        """Load the first snapshot and start the refresh loop"""
+        await self.refresh()
+        self._task = asyncio.create_task(self._run(), name="rate-refresher")
+        logger.info(f"Rate refresher started (interval {self.interval}s)")
+    
+    async def stop(self):
+        """Cancel the refresh loop"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Rate refresher stopped")
+    
+    async def refresh(self) -> bool:
+        """Fetch the feed, swap in the new table and rebuild the catalog"""
+        rates_ok = await self.client.refresh_rates()
+        try:
+            await self.client.refresh_directions()
+        except Exception as e:
+            logger.error(f"Directions refresh failed: {str(e)}")
+            return False
+        return rates_ok
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Rate refresh failed: {str(e)}")
+
+
+# Singleton instance
+rate_refresher = RateRefresher(wirebit_client, settings.rates_refresh_interval)
@@ -0,0 +1,106 @@
+import gzip
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Iterable, NamedTuple, Optional
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+
+# Preferred order when the client accepts several encodings equally
+ENCODING_PREFERENCE = ("br", "gzip", "identity")
+
+
+class RatesFeed(NamedTuple):
+    """Cached copy of the XML rate feed with its precompressed variants"""
+    content: bytes
+    digest: str
+    etag: Optional[str]  # upstream validators, sent back on revalidation
+    last_modified: Optional[str]
+    fetched_at: str  # HTTP date we first saw this content
+    variants: Dict[str, bytes]  # content-coding -> body
+    
+    def etag_for(self, encoding: str) -> str:
+        """Strong ETag of one representation, distinct per content-coding"""
+        if encoding == "identity":
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{encoding}"'
+    
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """True if an If-None-Match header names any representation of this feed"""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags:
+            return True
+        return any(self.etag_for(encoding) in tags for encoding in self.variants)
+    
+    def not_modified(self, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+        """Evaluate If-None-Match, or failing that If-Modified-Since against fetched_at"""
+        if if_none_match is not None:
+            return self.matches(if_none_match)
+        if not if_modified_since:
+            return False
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return parsedate_to_datetime(self.fetched_at).timestamp() <= since
+
+
+def content_digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def build_rates_feed(content: bytes, etag: Optional[str] = None,
+                     last_modified: Optional[str] = None) -> RatesFeed:
+    """Compress the feed once so every request can be served from memory"""
+    variants = {
+        "identity": content,
+        "gzip": gzip.compress(content, compresslevel=9)
+    }
+    if brotli is not None:
+        variants["br"] = brotli.compress(content, quality=11)
+    
+    return RatesFeed(
+        content=content,
+        digest=content_digest(content),
+        etag=etag,
+        last_modified=last_modified,
+        fetched_at=formatdate(usegmt=True),
+        variants=variants
+    )
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available: Iterable[str]) -> str:
+    """Pick the best content-coding from an Accept-Encoding header"""
+    available = set(available)
+    if not accept_encoding:
+        return "identity"
+    
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+    
+    def weight(coding: str) -> float:
+        if coding in weights:
+            return weights[coding]
+        if coding == "identity":
+            return 1.0 if weights.get("*", 1.0) > 0 else 0.0
+        return weights.get("*", 0.0)
+    
+    candidates = [coding for coding in ENCODING_PREFERENCE if coding in available and weight(coding) > 0]
+    if not candidates:
+        return "identity"
+    return max(candidates, key=weight)
@@ -0,0 +1,128 @@
+import logging
+import random
+import time
+from collections import deque
+from typing import Deque
+
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit is open"""
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker with half-open probing.
+    
+    Outcomes of the last `window_size` calls are kept; once at least
+    `min_calls` were seen and the failure rate reaches `failure_rate` the
+    circuit opens and calls fail fast for `open_seconds`. After that up to
+    `half_open_probes` trial calls are let through: if they all succeed the
+    circuit closes, any failure opens it again.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, name: str, window_size: int, min_calls: int, failure_rate: float,
+                 open_seconds: float, half_open_probes: int):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._outcomes: Deque[bool] = deque(maxlen=window_size)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+    
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            return self.HALF_OPEN
+        return self._state
+    
+    def before_call(self):
+        """Reserve a call slot or raise CircuitOpenError"""
+        if self._state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                raise CircuitOpenError(f"Circuit '{self.name}' is open")
+            self._state = self.HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+            logger.info(f"Circuit '{self.name}' half-open, probing upstream")
+        
+        if self._state == self.HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                raise CircuitOpenError(f"Circuit '{self.name}' is half-open")
+            self._probes_in_flight += 1
+    
+    def record_success(self):
+        if self._state == self.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_probes:
+                self._close()
+            return
+        self._outcomes.append(True)
+    
+    def record_failure(self):
+        if self._state == self.HALF_OPEN:
+            self._open()
+            return
+        self._outcomes.append(False)
+        if len(self._outcomes) >= self.min_calls:
+            failures = self._outcomes.count(False)
+            if failures / len(self._outcomes) >= self.failure_rate:
+                self._open()
+    
+    def release(self):
+        """Give back a reserved slot for a call that ended without a verdict (e.g. cancelled)"""
+        if self._state == self.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+    
+    def _open(self):
+        if self._state != self.OPEN:
+            logger.warning(f"Circuit '{self.name}' opened, failing fast for {self.open_seconds}s")
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+    
+    def _close(self):
+        logger.info(f"Circuit '{self.name}' closed")
+        self._state = self.CLOSED
+        self._outcomes.clear()
+
+
+class RetryBudget:
+    """Caps retries to a fraction of recent traffic.
+    
+    Every request deposits `ratio` tokens (up to `max_tokens`), every retry
+    spends one, so during an outage retries add at most `ratio` extra load.
+    """
+    
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+    
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+    
+    def record_request(self):
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+    
+    def try_spend(self) -> bool:
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
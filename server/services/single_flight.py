@@ -0,0 +1,49 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one in-flight request.
+    
+    The first caller for a key starts the work; everyone else arriving while
+    it is running awaits the same task and receives the same result or error.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+    
+    def in_flight(self) -> int:
+        """Number of distinct keys currently being fetched"""
+        return len(self._calls)
+    
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            logger.debug(f"Coalesced call for {key}")
+        
+        # Shield so a cancelled waiter does not cancel the call for everyone else
+        return await asyncio.shield(task)
+    
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the error as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+
+def request_key(method: str, endpoint: str, params: Any = None) -> Hashable:
+    """Build a hashable key from an upstream call's method, endpoint and params"""
+    if isinstance(params, dict):
+        params = tuple(sorted((str(k), str(v)) for k, v in params.items()))
+    return (method.upper(), endpoint, params)
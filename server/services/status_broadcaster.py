@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set, Tuple
+
+from core.config import settings
+from services.wirebit_client import TERMINAL_STATUSES, WirebitClient, wirebit_client
+
+
+logger = logging.getLogger(__name__)
+
+StatusEvent = Tuple[str, Dict[str, Any]]
+
+
+class StatusSubscription:
+    """Latest undelivered status per bid for one subscriber.
+    
+    A newer status of a bid replaces one the consumer has not read yet, so
+    a slow consumer skips intermediate states but never loses the latest
+    (in particular the final) status of any of its bids.
+    """
+    
+    def __init__(self):
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._ready = asyncio.Event()
+    
+    def offer(self, bid_id: str, result: Dict[str, Any]):
+        # Re-insert so bids are delivered in the order they last changed
+        self._latest.pop(bid_id, None)
+        self._latest[bid_id] = result
+        self._ready.set()
+    
+    async def get(self) -> StatusEvent:
+        """Wait for and take the least recently changed undelivered status"""
+        while not self._latest:
+            self._ready.clear()
+            await self._ready.wait()
+        bid_id = next(iter(self._latest))
+        return bid_id, self._latest.pop(bid_id)
+
+
+class StatusBroadcaster:
+    """Pushes bid status changes to subscribers.
+    
+    Each bid with at least one subscriber has exactly one upstream watch task,
+    no matter how many clients follow it. Subscribers only receive an event
+    when the status actually changes (plus the last known one on subscribe).
+    """
+    
+    def __init__(self, client: WirebitClient, interval: float):
+        self.client = client
+        self.interval = interval
+        self._subscribers: Dict[str, Set[StatusSubscription]] = {}
+        self._watches: Dict[str, asyncio.Task] = {}
+        self._last: Dict[str, Dict[str, Any]] = {}
+    
+    def watched_bids(self) -> int:
+        return len(self._watches)
+    
+    @asynccontextmanager
+    async def subscribe(self, bid_ids: Iterable[str]) -> AsyncIterator[StatusSubscription]:
+        """Subscription receiving (bid_id, status) events for the given bids until the context exits"""
+        subscription = StatusSubscription()
+        bid_ids = list(dict.fromkeys(bid_ids))
+        
+        for bid_id in bid_ids:
+            self._subscribers.setdefault(bid_id, set()).add(subscription)
+            if bid_id in self._last:
+                subscription.offer(bid_id, self._last[bid_id])
+            if bid_id not in self._watches:
+                self._watches[bid_id] = asyncio.create_task(self._watch(bid_id), name=f"status-watch-{bid_id}")
+        
+        try:
+            yield subscription
+        finally:
+            for bid_id in bid_ids:
+                subscribers = self._subscribers.get(bid_id)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    self._drop(bid_id)
+    
+    def publish(self, bid_id: str, result: Dict[str, Any]):
+        """Deliver a status to every subscriber of the bid if it changed"""
+        previous = self._last.get(bid_id)
+        if previous is not None and previous.get("status") == result.get("status"):
+            return
+        self._last[bid_id] = result
+        for subscription in self._subscribers.get(bid_id, ()):
+            subscription.offer(bid_id, result)
+    
+    async def stop(self):
+        """Cancel all upstream watches"""
+        for bid_id in list(self._watches):
+            self._drop(bid_id)
+    
+    def _drop(self, bid_id: str):
+        self._subscribers.pop(bid_id, None)
+        self._last.pop(bid_id, None)
+        task = self._watches.pop(bid_id, None)
+        if task is not None:
+            task.cancel()
+    
+    async def _watch(self, bid_id: str):
+        while True:
+            try:
+                result = await self.client.get_status(bid_id)
+            except Exception as e:
+                logger.error(f"Status watch for bid {bid_id} failed: {str(e)}")
+                result = None
+            
+            if result and result.get("success"):
+                self.publish(bid_id, result)
+                if result.get("status") in TERMINAL_STATUSES:
+                    # Nothing left to watch, subscribers keep the final event
+                    self._watches.pop(bid_id, None)
+                    return
+            
+            await asyncio.sleep(self.interval)
+
+
+# Singleton instance
+status_broadcaster = StatusBroadcaster(wirebit_client, settings.status_stream_interval)
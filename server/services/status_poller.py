@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+from core.config import settings
+from sqlalchemy import select, update
+
+from database import AsyncSessionLocal
+from models.models import ExchangeHistory
+from services.admin_stats import StatsChange
+from services.wirebit_client import TERMINAL_STATUSES, WirebitClient, wirebit_client
+
+
+logger = logging.getLogger(__name__)
+
+
+class TrackedBid(NamedTuple):
+    id: int
+    bid_id: str
+    status: str
+    created_at: Optional[datetime]
+    amount_give: float
+    amount_get: float
+
+
+class _Schedule(NamedTuple):
+    next_check: float
+    delay: float
+
+
+class BidStatusPoller:
+    """Keeps exchange_history.status in sync with Wirebit for in-flight bids.
+    
+    Every pass loads up to `load_limit` non-terminal bids younger than
+    `max_age`, least recently checked first, checks the ones that are due in
+    concurrency-limited batches and writes the results in one transaction.
+    Each bid backs off on its own: young bids are checked often, bids that
+    keep reporting the same status are checked less and less. A status is
+    only written if the row still has the status seen at load time, so
+    changes made by admins or other workers meanwhile are not overwritten.
+    """
+    
+    def __init__(self, client: WirebitClient, interval: float, concurrency: int, batch_size: int,
+                 min_backoff: float, max_backoff: float, max_age: timedelta, load_limit: int):
+        self.client = client
+        self.interval = interval
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.max_age = max_age
+        self.load_limit = load_limit
+        self._schedule: Dict[int, _Schedule] = {}
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        """Start the polling loop"""
+        self._task = asyncio.create_task(self._run(), name="bid-status-poller")
+        logger.info(f"Bid status poller started (concurrency {self.concurrency})")
+    
+    async def stop(self):
+        """Cancel the polling loop"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Bid status poller stopped")
+    
+    async def _run(self):
+        while True:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.error(f"Bid status poll failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+    
+    async def poll_once(self) -> int:
+        """Check all due bids once, returns the number of status changes written"""
+        tracked = await self._load_tracked()
+        
+        # Forget bids that reached a terminal state or disappeared
+        tracked_ids = {bid.id for bid in tracked}
+        for row_id in list(self._schedule):
+            if row_id not in tracked_ids:
+                del self._schedule[row_id]
+        
+        now = time.monotonic()
+        due = [bid for bid in tracked if self._is_due(bid, now)]
+        due.sort(key=lambda bid: self._schedule[bid.id].next_check)
+        due = due[:self.batch_size]
+        if not due:
+            return 0
+        
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._check(bid, semaphore) for bid in due))
+        
+        changes = {bid.id: status for bid, status in zip(due, results) if status and status != bid.status}
+        now = time.monotonic()
+        for bid in due:
+            self._reschedule(bid, changed=bid.id in changes, now=now)
+        
+        written = await self._write_results(due, changes)
+        if written:
+            logger.info(f"Synced {written} bid status changes from Wirebit")
+        return written
+    
+    def _is_due(self, bid: TrackedBid, now: float) -> bool:
+        if bid.id not in self._schedule:
+            # Newly seen bids are due immediately
+            self._schedule[bid.id] = _Schedule(next_check=now, delay=self._initial_delay(bid))
+        return self._schedule[bid.id].next_check <= now
+    
+    def _initial_delay(self, bid: TrackedBid) -> float:
+        """Older bids start further along the backoff curve"""
+        if bid.created_at is None:
+            return self.min_backoff
+        age = (datetime.utcnow() - bid.created_at).total_seconds()
+        return min(self.max_backoff, max(self.min_backoff, age / 60))
+    
+    def _reschedule(self, bid: TrackedBid, changed: bool, now: float):
+        schedule = self._schedule[bid.id]
+        if changed:
+            delay = self.min_backoff
+        else:
+            delay = min(self.max_backoff, schedule.delay * 1.5)
+        self._schedule[bid.id] = _Schedule(next_check=now + delay, delay=delay)
+    
+    async def _check(self, bid: TrackedBid, semaphore: asyncio.Semaphore) -> Optional[str]:
+        async with semaphore:
+            result = await self.client.get_status(bid.bid_id)
+        if not result.get("success") or result.get("status") == "unknown":
+            return None
+        return result.get("status")
+    
+    async def _load_tracked(self) -> List[TrackedBid]:
+        # The created_at bound keeps this on the created_at index and leaves
+        # out bids stuck upstream for good; the limit takes the ones whose
+        # last check is oldest
+        created_after = datetime.utcnow() - self.max_age
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(
+                    ExchangeHistory.id,
+                    ExchangeHistory.bid_id,
+                    ExchangeHistory.status,
+                    ExchangeHistory.created_at,
+                    ExchangeHistory.amount_give,
+                    ExchangeHistory.amount_get
+                ).where(
+                    ExchangeHistory.created_at >= created_after,
+                    ExchangeHistory.bid_id.isnot(None),
+                    ExchangeHistory.status.notin_(TERMINAL_STATUSES)
+                ).order_by(
+                    ExchangeHistory.status_checked_at.asc().nullsfirst(),
+                    ExchangeHistory.id
+                ).limit(self.load_limit)
+            )
+            return [TrackedBid(*row) for row in result.all()]
+    
+    async def _write_results(self, checked: List[TrackedBid], changes: Dict[int, str]) -> int:
+        """Record the check time of every checked bid and write status changes.
+        
+        Returns the number of statuses written.
+        """
+        written = 0
+        async with AsyncSessionLocal() as db:
+            now = datetime.utcnow()
+            stats = StatsChange()
+            for bid in checked:
+                if bid.id not in changes:
+                    continue
+                # Only if nobody changed the row since it was loaded
+                result = await db.execute(
+                    update(ExchangeHistory).where(
+                        ExchangeHistory.id == bid.id,
+                        ExchangeHistory.status == bid.status
+                    ).values(status=changes[bid.id], updated_at=now, status_checked_at=now)
+                )
+                if result.rowcount:
+                    stats.exchange_status(bid.status, changes[bid.id], bid.amount_give, bid.amount_get)
+                    written += 1
+            await stats.apply(db)
+            
+            unchanged = [bid.id for bid in checked if bid.id not in changes]
+            if unchanged:
+                # A check alone is not a modification of the exchange
+                await db.execute(
+                    update(ExchangeHistory).where(ExchangeHistory.id.in_(unchanged)).values(
+                        status_checked_at=now, updated_at=ExchangeHistory.updated_at
+                    )
+                )
+            await db.commit()
+        return written
+
+# Singleton instance
+bid_status_poller = BidStatusPoller(
+    wirebit_client,
+    interval=settings.status_poll_interval,
+    concurrency=settings.status_poll_concurrency,
+    batch_size=settings.status_poll_batch_size,
+    min_backoff=settings.status_poll_min_backoff,
+    max_backoff=settings.status_poll_max_backoff,
+    max_age=timedelta(days=settings.status_poll_max_age_days),
+    load_limit=settings.status_poll_load_limit
+)
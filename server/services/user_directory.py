@@ -0,0 +1,70 @@
+import logging
+from typing import Optional
+
+from sqlalchemy import or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement
+
+from models.models import User
+
+
+logger = logging.getLogger(__name__)
+
+# FTS5 trigram queries need at least three characters to hit the index
+MIN_TRIGRAM_LENGTH = 3
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class UserDirectorySearch:
+    """Builds the username/email search filter for the admin user directory.
+    
+    PostgreSQL uses ILIKE, served by the pg_trgm GIN indexes. SQLite matches
+    against the users_fts trigram table when the migration was able to create
+    it and falls back to LIKE otherwise.
+    """
+    
+    def __init__(self):
+        self._sqlite_fts: Optional[bool] = None
+    
+    async def _has_sqlite_fts(self, db: AsyncSession) -> bool:
+        if self._sqlite_fts is None:
+            found = await db.scalar(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'"
+            ))
+            self._sqlite_fts = found is not None
+            if not self._sqlite_fts:
+                logger.warning("users_fts is missing, user search falls back to LIKE scans")
+        return self._sqlite_fts
+    
+    async def clause(self, db: AsyncSession, q: str) -> Optional[ColumnElement]:
+        q = q.strip()
+        if not q:
+            return None
+        
+        pattern = _escape_like(q)
+        dialect = db.bind.dialect.name
+        
+        if dialect == "sqlite" and len(q) >= MIN_TRIGRAM_LENGTH and await self._has_sqlite_fts(db):
+            phrase = '"' + q.replace('"', '""') + '"'
+            matches = select(text("rowid")).select_from(text("users_fts")).where(
+                text("users_fts MATCH :user_query").bindparams(user_query=phrase)
+            )
+            return User.id.in_(matches)
+        
+        if dialect == "sqlite" and len(q) < MIN_TRIGRAM_LENGTH:
+            # Too short for trigrams: treat it as a prefix rather than scanning for substrings
+            return or_(
+                User.username.ilike(f"{pattern}%", escape="\\"),
+                User.email.ilike(f"{pattern}%", escape="\\")
+            )
+        
+        return or_(
+            User.username.ilike(f"%{pattern}%", escape="\\"),
+            User.email.ilike(f"%{pattern}%", escape="\\")
+        )
+
+
+user_directory_search = UserDirectorySearch()
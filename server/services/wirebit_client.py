@@ -1,12 +1,39 @@
-import requests
+import asyncio
+import httpx
+import hashlib
+import json
 import logging
-from typing import Dict, Any, Optional, List
-import xml.etree.ElementTree as ET
+import time
+from types import MappingProxyType
+from typing import Dict, Any, Optional, List, Tuple
 from core.config import settings
+from core.cache import TTLCache
+from core.log_config import LogSampler
+from services.http_client import http_client
+from services.directions_catalog import DirectionsCatalog, EMPTY_CATALOG
+from services.single_flight import SingleFlight, request_key
+from services.rates_feed import RatesFeed, build_rates_feed, content_digest
+from services.rate_parser import RateEntry, RateTable, DEFAULT_RATE, parse_rates, diff_rates
+from services.resilience import CircuitBreaker, CircuitOpenError, RetryBudget, backoff_delay
+from services.concurrency_limiter import AdaptiveConcurrencyLimiter, LimiterTimeoutError
 
 
 logger = logging.getLogger(__name__)
 
+# Upstream bodies (the directions list especially) are large; log only a sample
+response_sampler = LogSampler(settings.log_payload_sample_rate)
+
+# Bid statuses that can never change again
+TERMINAL_STATUSES = frozenset({"completed", "cancelled", "rejected"})
+
+
+class WirebitError(Exception):
+    """Failed Wirebit call; retryable marks transient failures safe to repeat for idempotent calls"""
+    
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
 
 class WirebitClient:
     def __init__(self):
@@ -17,58 +44,114 @@ class WirebitClient:
             "API-LOGIN": settings.wirebit_api_login,
             "Content-Type": "application/json"
         }
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
-        self._rates_cache = {}
-        self._load_rates()
+        # Immutable snapshot, replaced wholesale by refresh_rates()
+        self._rates_cache: RateTable = MappingProxyType({})
+        self.rates_loaded_at: Optional[float] = None
+        self._feed: Optional[RatesFeed] = None
+        self._catalog: DirectionsCatalog = EMPTY_CATALOG
+        self._single_flight = SingleFlight()
+        self._status_cache = TTLCache(maxsize=settings.status_cache_size, ttl=settings.status_cache_ttl)
+        self._breaker = CircuitBreaker(
+            "wirebit",
+            window_size=settings.wirebit_breaker_window,
+            min_calls=settings.wirebit_breaker_min_calls,
+            failure_rate=settings.wirebit_breaker_failure_rate,
+            open_seconds=settings.wirebit_breaker_open_seconds,
+            half_open_probes=settings.wirebit_breaker_half_open_probes
+        )
+        self._retry_budget = RetryBudget(
+            ratio=settings.wirebit_retry_budget_ratio,
+            max_tokens=settings.wirebit_retry_budget_max
+        )
+        self._limiter = AdaptiveConcurrencyLimiter(
+            "wirebit",
+            initial_limit=settings.wirebit_concurrency_initial,
+            min_limit=settings.wirebit_concurrency_min,
+            max_limit=settings.wirebit_concurrency_max,
+            latency_tolerance=settings.wirebit_latency_tolerance,
+            backoff_ratio=settings.wirebit_concurrency_backoff,
+            max_queue=settings.wirebit_max_queue
+        )
     
-    def _load_rates(self):
-        """Load exchange rates from XML API"""
+    async def _fetch_rates_feed(self) -> Optional[Tuple[bytes, Optional[str], Optional[str]]]:
+        """Conditionally download the XML feed.
+        
+        Returns (content, etag, last_modified), or None if it has not changed.
+        """
+        headers = {"Accept": "application/xml"}
+        current = self._feed
+        if current is not None:
+            if current.etag:
+                headers["If-None-Match"] = current.etag
+            if current.last_modified:
+                headers["If-Modified-Since"] = current.last_modified
+        
+        response = await http_client.client.get(
+            self.rates_url, headers=headers, timeout=settings.rates_fetch_timeout
+        )
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        
+        content = response.content
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        
+        # Servers without validators still let us skip parsing identical bodies
+        if current is not None and content_digest(content) == current.digest:
+            self._feed = current._replace(etag=etag, last_modified=last_modified)
+            return None
+        return content, etag, last_modified
+    
+    async def refresh_rates(self) -> bool:
+        """Rebuild the rate table and swap it in, keeping the old one on failure"""
+        return await self._single_flight.do(("GET", "rates_feed", None), self._refresh_rates)
+    
+    async def _refresh_rates(self) -> bool:
         try:
-            response = requests.get(self.rates_url)
-            response.raise_for_status()
-            
-            root = ET.fromstring(response.content)
-            
-            # Parse XML and create rates mapping
-            for item in root.findall('item'):
-                from_currency = item.find('from').text
-                to_currency = item.find('to').text
-                in_amount = float(item.find('in').text)
-                out_amount = float(item.find('out').text)
-                
-                # Calculate rate (out/in)
-                rate = out_amount / in_amount if in_amount > 0 else 1
-                
-                # Parse min/max amounts
-                min_text = item.find('minamount').text
-                max_text = item.find('maxamount').text
-                
-                # Extract numeric values from min/max
-                min_amount = float(min_text.split()[0]) if min_text else 0
-                max_amount = float(max_text.split()[0]) if max_text else 999999
-                
-                # Create key for rates cache
-                key = f"{from_currency}_{to_currency}"
-                self._rates_cache[key] = {
-                    "rate": rate,
-                    "min": min_amount,
-                    "max": max_amount,
-                    "reserve": float(item.find('amount').text) if item.find('amount') is not None else 0
-                }
-                
-            logger.info(f"Loaded {len(self._rates_cache)} exchange rates from XML")
-            
+            fetched = await self._fetch_rates_feed()
+            if fetched is None:
+                # 304 or identical body: the current table is still valid
+                self.rates_loaded_at = time.monotonic()
+                logger.debug("Rates feed unchanged, skipping parse")
+                return True
+            content, etag, last_modified = fetched
+            # Parse and compress once per change, off the event loop
+            rates = await asyncio.to_thread(parse_rates, content)
+            feed = await asyncio.to_thread(build_rates_feed, content, etag, last_modified)
         except Exception as e:
             logger.error(f"Error loading rates from XML: {str(e)}")
-            # Keep empty cache if loading fails
+            return False
+        
+        diff = diff_rates(self._rates_cache, rates)
+        
+        # Validators are only remembered once the body parsed, so a bad feed is retried
+        self._feed = feed
+        # Single reference assignment, readers see either the old or the new table
+        self._rates_cache = rates
+        self.rates_loaded_at = time.monotonic()
+        logger.info(
+            f"Loaded {len(rates)} exchange rates from XML "
+            f"({len(diff.changed)} changed, {len(diff.added)} added, {len(diff.removed)} removed)"
+        )
+        if diff.changed:
+            logger.debug(f"Changed rate pairs: {diff.changed}")
+        return True
+    
+    async def get_rates_feed(self) -> RatesFeed:
+        """Cached XML feed, fetched on demand only if the refresher has not loaded it yet"""
+        if self._feed is None and not await self.refresh_rates():
+            raise Exception("Failed to fetch rates from Wirebit")
+        return self._feed
     
-    def _get_rate_info(self, from_currency: str, to_currency: str) -> Dict[str, Any]:
+    def _get_rate_info(self, from_currency: str, to_currency: str) -> RateEntry:
         """Get rate info from cache"""
+        rates = self._rates_cache
+        
         # Try exact match first
         key = f"{from_currency}_{to_currency}"
-        if key in self._rates_cache:
-            return self._rates_cache[key]
+        if key in rates:
+            return rates[key]
         
         # Try with simplified currency names (remove suffixes like TRC20, ERC20)
         from_simple = from_currency.split()[0]
@@ -98,39 +181,107 @@ class WirebitClient:
         
         # Try with mapped names
         key = f"{from_mapped}_{to_mapped}"
-        if key in self._rates_cache:
-            return self._rates_cache[key]
+        if key in rates:
+            return rates[key]
         
         # Return default if not found
-        return {"rate": 1, "min": 10, "max": 10000, "reserve": 0}
+        return DEFAULT_RATE
     
-    def _make_request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
+    async def _make_request(self, method: str, endpoint: str, headers: Optional[Dict[str, str]] = None,
+                            **kwargs) -> Dict[str, Any]:
+        """Make HTTP request to Wirebit API, coalescing and retrying idempotent reads"""
+        if method.upper() != "GET":
+            return await self._send_request(method, endpoint, headers, **kwargs)
+        
+        # Concurrent identical GETs share one upstream call; callers must not mutate the result
+        key = request_key(method, endpoint, kwargs.get("params"))
+        return await self._single_flight.do(
+            key, lambda: self._send_with_retries(method, endpoint, headers, **kwargs)
+        )
+    
+    async def _send_with_retries(self, method: str, endpoint: str, headers: Optional[Dict[str, str]] = None,
+                                 **kwargs) -> Dict[str, Any]:
+        """Retry transient failures with jittered backoff while the retry budget allows"""
+        self._retry_budget.record_request()
+        attempt = 0
+        while True:
+            try:
+                return await self._send_request(method, endpoint, headers, **kwargs)
+            except WirebitError as e:
+                if (not e.retryable or attempt >= settings.wirebit_max_retries
+                        or not self._retry_budget.try_spend()):
+                    raise
+                attempt += 1
+                delay = backoff_delay(attempt, settings.wirebit_retry_backoff_base, settings.wirebit_retry_backoff_cap)
+                logger.warning(f"Retrying {endpoint} in {delay:.2f}s (attempt {attempt})")
+                await asyncio.sleep(delay)
+    
+    async def _send_request(self, method: str, endpoint: str, headers: Optional[Dict[str, str]] = None,
+                            **kwargs) -> Dict[str, Any]:
         """Make HTTP request to Wirebit API with error handling"""
         url = f"{self.base_url}{endpoint}"
         
+        try:
+            self._breaker.before_call()
+        except CircuitOpenError:
+            logger.warning(f"Circuit open, not calling {endpoint}")
+            raise WirebitError("Сервис Wirebit временно недоступен, попробуйте позже")
+        
         try:
             logger.info(f"Making {method} request to {url}")
-            response = self.session.request(method, url, **kwargs)
+            async with self._limiter.acquire(endpoint, timeout=settings.wirebit_queue_timeout):
+                response = await http_client.client.request(
+                    method, url, headers={**self.headers, **(headers or {})}, **kwargs
+                )
             response.raise_for_status()
             
             data = response.json()
-            logger.info(f"Response from {endpoint}: {data}")
+            logger.info(f"Response from {endpoint} ({len(response.content)} bytes)")
+            if logger.isEnabledFor(logging.DEBUG) and response_sampler():
+                # Serialised, redacted and capped on the log writer thread
+                logger.debug(f"Sampled response body from {endpoint}", extra={"payload": data})
+            self._breaker.record_success()
             return data
             
-        except requests.exceptions.RequestException as e:
+        except LimiterTimeoutError as e:
+            # Never reached upstream, so this says nothing about its health
+            self._breaker.release()
+            logger.warning(f"Not calling {endpoint}: {str(e)}")
+            raise WirebitError("Сервис Wirebit перегружен, попробуйте позже")
+        except httpx.HTTPStatusError as e:
+            # Only throttling and server errors say something about upstream health
+            transient = e.response.status_code == 429 or e.response.status_code >= 500
+            if transient:
+                self._breaker.record_failure()
+            else:
+                self._breaker.record_success()
+            logger.error(f"Request error for {endpoint}: {str(e)}")
+            raise WirebitError(f"Ошибка при обращении к API: {str(e)}", retryable=transient)
+        except httpx.HTTPError as e:
+            self._breaker.record_failure()
             logger.error(f"Request error for {endpoint}: {str(e)}")
-            raise Exception(f"Ошибка при обращении к API: {str(e)}")
+            raise WirebitError(f"Ошибка при обращении к API: {str(e)}", retryable=True)
         except ValueError as e:
+            self._breaker.record_failure()
             logger.error(f"JSON decode error for {endpoint}: {str(e)}")
-            raise Exception("Некорректный ответ от сервера")
+            raise WirebitError("Некорректный ответ от сервера")
+        except BaseException:
+            self._breaker.release()
+            raise
+    
+    def upstream_stats(self) -> Dict[str, Any]:
+        """Resilience state for health reporting"""
+        return {
+            "circuit": self._breaker.state,
+            "retry_tokens": round(self._retry_budget.tokens, 2),
+            "concurrency": self._limiter.stats()
+        }
     
-    def get_directions(self) -> List[Dict[str, Any]]:
+    async def get_directions(self) -> List[Dict[str, Any]]:
         """Get all exchange directions from Wirebit"""
         try:
-            # Reload rates to get fresh data
-            self._load_rates()
-            
-            response = self._make_request("GET", "get_directions")
+            # Rates come from the snapshot kept fresh by the background refresher
+            response = await self._make_request("GET", "get_directions")
             
             # Check if request was successful (error = 0 means success)
             if response.get("error") == 0:
@@ -152,9 +303,9 @@ class WirebitClient:
                         "to": to_currency,
                         "from_logo": direction.get("currency_give_logo"),
                         "to_logo": direction.get("currency_get_logo"),
-                        "rate": rate_info["rate"],
-                        "min": rate_info["min"],
-                        "max": rate_info["max"]
+                        "rate": rate_info.rate,
+                        "min": rate_info.min,
+                        "max": rate_info.max
                     })
                 
                 return processed_directions
@@ -167,7 +318,32 @@ class WirebitClient:
             logger.error(f"Error getting directions: {str(e)}")
             raise
     
-    def create_bid(self, direction_id: str, amount: float, account_to: Optional[str] = None, 
+    @property
+    def catalog(self) -> DirectionsCatalog:
+        """Last published directions catalog (may be empty before the first refresh)"""
+        return self._catalog
+    
+    async def refresh_directions(self) -> bool:
+        """Fetch directions and rebuild the catalog if upstream data changed"""
+        directions = await self.get_directions()
+        fingerprint = hashlib.sha256(
+            json.dumps(directions, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        
+        if fingerprint == self._catalog.fingerprint:
+            return False
+        
+        self._catalog = DirectionsCatalog(directions, fingerprint)
+        logger.info(f"Directions catalog rebuilt with {len(self._catalog)} directions")
+        return True
+    
+    async def get_catalog(self) -> DirectionsCatalog:
+        """Return the catalog, loading it on demand if the refresher has not yet"""
+        if self._catalog is EMPTY_CATALOG:
+            await self.refresh_directions()
+        return self._catalog
+    
+    async def create_bid(self, direction_id: str, amount: float, account_to: Optional[str] = None, 
                    account2: Optional[str] = None, cfgive8: Optional[str] = None,
                    cf6: str = "", cf11: Optional[str] = None) -> Dict[str, Any]:
         """Create exchange bid"""
@@ -219,23 +395,16 @@ class WirebitClient:
             if cf11:
                 payload["cf11"] = cf11
             
-            # Use form headers for this request
-            form_headers = {
-                "API-KEY": settings.wirebit_api_key,
-                "API-LOGIN": settings.wirebit_api_login,
-                "Content-Type": "application/x-www-form-urlencoded"
-            }
-            
-            logger.info(f"Creating bid with payload: {payload}")
+            logger.info("Creating bid", extra={"payload": payload})
             
-            response = requests.post(
-                f"{self.base_url}create_bid",
-                headers=form_headers,
+            # Use form headers for this request
+            data = await self._make_request(
+                "POST",
+                "create_bid",
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
                 data=payload,
-                timeout=30
+                timeout=settings.create_bid_timeout
             )
-            response.raise_for_status()
-            data = response.json()
             
             if data.get("error") == "0" or data.get("error") == 0:
                 return {
@@ -247,7 +416,7 @@ class WirebitClient:
             else:
                 error_msg = data.get("error_text", "Не удалось создать заявку")
                 logger.error(f"Wirebit API error: {error_msg}")
-                logger.error(f"Full Wirebit response: {data}")
+                logger.error("Full Wirebit response", extra={"payload": data})
                 
                 # Try to extract more detailed error info
                 error_fields = data.get("error_fields", {})
@@ -284,11 +453,15 @@ class WirebitClient:
                 "message": str(e)
             }
     
-    def get_status(self, bid_id: str) -> Dict[str, Any]:
+    async def get_status(self, bid_id: str) -> Dict[str, Any]:
         """Get bid status"""
+        cached = self._status_cache.get(bid_id)
+        if cached is not None:
+            return cached
+        
         try:
             params = {"bid_id": bid_id}
-            response = self._make_request("GET", "get_status", params=params)
+            response = await self._make_request("GET", "get_status", params=params)
             
             if response.get("error") == 0:
                 status_data = response.get("data", {})
@@ -304,12 +477,17 @@ class WirebitClient:
                     "rejected": "Заявка отклонена администратором"
                 }
                 
-                return {
+                result = {
                     "success": True,
                     "status": status,
                     "message": status_messages.get(status, status),
                     "data": status_data
                 }
+                
+                # Final statuses never change, pin them until the LRU evicts them
+                ttl = None if status in TERMINAL_STATUSES else settings.status_cache_ttl
+                self._status_cache.set(bid_id, result, ttl=ttl)
+                return result
             else:
                 error_msg = response.get("error_text", "Не удалось получить статус заявки")
                 return {
@@ -0,0 +1,169 @@
+import asyncio
+import os
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from services.blob_store import BlobStore, LocalBlobStore, S3BlobStore
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+requests = pytest.importorskip("requests")
+
+BUCKET = "documents"
+KEY = "objects/ab/cd/abcd.png"
+CONTENT = bytes(range(256)) * 40  # 10240 bytes
+
+
+@pytest.fixture
+def local_store(tmp_path):
+    return LocalBlobStore(str(tmp_path / "store"))
+
+
+@pytest.fixture
+def s3_store(tmp_path, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with moto.mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        yield S3BlobStore(
+            bucket=BUCKET,
+            prefix="verification/",
+            work_dir=str(tmp_path / "work"),
+            presign_expiry=60,
+            region_name="us-east-1"
+        )
+
+
+@pytest.fixture(params=["local", "s3"])
+def store(request):
+    return request.getfixturevalue(f"{request.param}_store")
+
+
+def write_source(tmp_path, content: bytes = CONTENT) -> str:
+    path = tmp_path / "upload.tmp"
+    path.write_bytes(content)
+    return str(path)
+
+
+async def read(store, key: str, start: int = 0, end=None) -> bytes:
+    return b"".join([chunk async for chunk in store.iter_bytes(key, start, end)])
+
+
+def test_put_file_moves_source_and_stat_reports_size(store, tmp_path):
+    source = write_source(tmp_path)
+    
+    asyncio.run(store.put_file(KEY, source, "image/png"))
+    info = asyncio.run(store.stat(KEY))
+    
+    assert not os.path.exists(source)
+    assert info.key == KEY
+    assert info.size == len(CONTENT)
+    assert info.etag
+    assert asyncio.run(store.stat("objects/ab/cd/missing.png")) is None
+
+
+def test_list_returns_keys_under_prefix(store, tmp_path):
+    for key in (KEY, "objects/ab/cd/abcd.preview.jpg", "objects/ef/01/ef01.pdf"):
+        asyncio.run(store.put_file(key, write_source(tmp_path), "application/octet-stream"))
+    
+    keys = sorted(info.key for info in asyncio.run(store.list("objects/ab/")))
+    everything = asyncio.run(store.list("objects/"))
+    
+    assert keys == [KEY, "objects/ab/cd/abcd.preview.jpg"]
+    assert len(everything) == 3
+    assert all(info.size == len(CONTENT) for info in everything)
+
+
+def test_iter_bytes_whole_and_ranges(store, tmp_path):
+    asyncio.run(store.put_file(KEY, write_source(tmp_path), "image/png"))
+    
+    assert asyncio.run(read(store, KEY)) == CONTENT
+    assert asyncio.run(read(store, KEY, 100, 199)) == CONTENT[100:200]
+    assert asyncio.run(read(store, KEY, 10000)) == CONTENT[10000:]
+    assert asyncio.run(read(store, KEY, 0, 0)) == CONTENT[:1]
+
+
+def test_local_copy_yields_content_and_keeps_handed_over_files(store, tmp_path):
+    asyncio.run(store.put_file(KEY, write_source(tmp_path), "image/png"))
+    
+    async def scenario():
+        async with store.local_copy(KEY) as path:
+            with open(path, "rb") as f:
+                content = f.read()
+            variant = os.path.join(os.path.dirname(path), "abcd.preview.jpg")
+            with open(variant, "wb") as f:
+                f.write(b"preview")
+            await store.put_file("objects/ab/cd/abcd.preview.jpg", variant, "image/jpeg")
+        return path, content
+    
+    path, content = asyncio.run(scenario())
+    
+    assert content == CONTENT
+    assert asyncio.run(read(store, "objects/ab/cd/abcd.preview.jpg")) == b"preview"
+    if isinstance(store, S3BlobStore):
+        # The downloaded copy and its work directory are gone
+        assert not os.path.exists(os.path.dirname(path))
+        assert os.listdir(store.work_dir) == []
+
+
+def test_delete(store, tmp_path):
+    asyncio.run(store.put_file(KEY, write_source(tmp_path), "image/png"))
+    
+    asyncio.run(store.delete(KEY))
+    
+    assert asyncio.run(store.stat(KEY)) is None
+    assert asyncio.run(store.list("objects/")) == []
+    # Deleting a missing blob is not an error
+    asyncio.run(store.delete(KEY))
+
+
+def test_local_store_has_paths_but_no_urls(local_store, tmp_path):
+    asyncio.run(local_store.put_file(KEY, write_source(tmp_path), "image/png"))
+    
+    assert local_store.presigned_url(KEY, "image/png", "document.png") is None
+    assert local_store.local_path(KEY) == os.path.join(local_store.root, "objects", "ab", "cd", "abcd.png")
+    with pytest.raises(ValueError):
+        local_store.path("../outside.png")
+
+
+def test_s3_presigned_url_downloads_blob(s3_store, tmp_path):
+    asyncio.run(s3_store.put_file(KEY, write_source(tmp_path), "image/png"))
+    
+    url = s3_store.presigned_url(KEY, "image/png", "document.png")
+    query = parse_qs(urlparse(url).query)
+    response = requests.get(url)
+    
+    assert s3_store.local_path(KEY) is None
+    assert f"verification/{KEY}" in url
+    assert query["response-content-disposition"] == ['inline; filename="document.png"']
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["Content-Type"] == "image/png"
+
+
+def test_list_pages_in_key_order(store, tmp_path):
+    keys = sorted(f"objects/{a}/{b}/{a}{b}{name}" for a in ("0a", "ff") for b in ("00", "1c")
+                  for name in (".png", ".preview.jpg", ".thumb.jpg"))
+    for key in keys:
+        asyncio.run(store.put_file(key, write_source(tmp_path), "application/octet-stream"))
+    
+    listed = []
+    start_after = ""
+    while True:
+        page = asyncio.run(store.list("objects/", start_after=start_after, limit=5))
+        listed += [info.key for info in page]
+        if len(page) < 5:
+            break
+        start_after = page[-1].key
+    
+    assert listed == keys
+
+
+def test_incomplete_backend_cannot_be_created():
+    class ReadOnlyStore(BlobStore):
+        async def stat(self, key):
+            return None
+    
+    with pytest.raises(TypeError):
+        ReadOnlyStore()
@@ -0,0 +1,141 @@
+import asyncio
+import random
+from typing import Optional
+
+import pytest
+
+from services import concurrency_limiter
+from services.concurrency_limiter import AdaptiveConcurrencyLimiter, LimiterTimeoutError
+
+
+# Healthy per-endpoint latencies in seconds, roughly as seen from Wirebit
+HEALTHY_LATENCY = {
+    "get_status": 0.02,
+    "get_directions": 0.15,
+    "refresh_rates": 0.3,
+    "create_bid": 0.6,
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(concurrency_limiter, "time", clock)
+    return clock
+
+
+def make_limiter(**overrides) -> AdaptiveConcurrencyLimiter:
+    options = dict(initial_limit=20, min_limit=2, max_limit=200, latency_tolerance=2.0,
+                   backoff_ratio=0.9, max_queue=10)
+    options.update(overrides)
+    return AdaptiveConcurrencyLimiter("test", **options)
+
+
+async def call(limiter: AdaptiveConcurrencyLimiter, clock: FakeClock, key: str, latency: float):
+    async with limiter.acquire(key):
+        clock.now += latency
+
+
+def test_limit_stays_up_under_mixed_healthy_latencies(clock):
+    limiter = make_limiter()
+    rng = random.Random(1)
+    
+    async def scenario():
+        lowest = limiter.limit
+        for _ in range(4000):
+            key = rng.choice(list(HEALTHY_LATENCY))
+            # Ordinary jitter: single calls up to about 3x the typical latency
+            await call(limiter, clock, key, HEALTHY_LATENCY[key] * rng.lognormvariate(0, 0.35))
+            lowest = min(lowest, limiter.limit)
+        return lowest
+    
+    lowest = asyncio.run(scenario())
+    assert lowest >= 20
+
+
+async def burst(limiter: AdaptiveConcurrencyLimiter, clock: FakeClock, key: str, latency: float,
+                calls: int, error: Optional[Exception] = None):
+    """`calls` concurrent calls that all take `latency`, or all fail with `error`"""
+    acquired = 0
+    done = asyncio.Event()
+    
+    async def one():
+        nonlocal acquired
+        async with limiter.acquire(key):
+            acquired += 1
+            if acquired == calls:
+                clock.now += latency
+                done.set()
+            await done.wait()
+            if error is not None:
+                raise error
+    
+    await asyncio.gather(*(one() for _ in range(calls)), return_exceptions=True)
+
+
+def test_slow_burst_backs_off_once_per_window(clock):
+    limiter = make_limiter(max_limit=20)
+    
+    async def scenario():
+        for _ in range(200):
+            await call(limiter, clock, "get_status", HEALTHY_LATENCY["get_status"])
+        limits = [limiter.limit]
+        # Two windows of 20 slow calls in flight together: one decrease each
+        for _ in range(2):
+            await burst(limiter, clock, "get_status", HEALTHY_LATENCY["get_status"] * 5, calls=limiter.limit)
+            limits.append(limiter.limit)
+        return limits
+    
+    assert asyncio.run(scenario()) == [20, 18, 16]
+
+
+def test_slow_endpoint_is_not_congestion_for_fast_one(clock):
+    limiter = make_limiter()
+    
+    async def scenario():
+        for _ in range(100):
+            await call(limiter, clock, "get_status", 0.01)
+            await call(limiter, clock, "create_bid", 1.0)
+    
+    asyncio.run(scenario())
+    assert limiter.limit > 20
+    assert set(limiter.stats()["latency_ms"]) == {"get_status", "create_bid"}
+
+
+def test_transport_failures_back_off_once_per_window(clock):
+    limiter = make_limiter()
+    
+    async def scenario():
+        await burst(limiter, clock, "get_status", 0.02, calls=20, error=ConnectionError())
+        after_burst = limiter.limit
+        with pytest.raises(ConnectionError):
+            async with limiter.acquire("get_status"):
+                raise ConnectionError()
+        return after_burst
+    
+    assert asyncio.run(scenario()) == 18
+    assert limiter.limit == 16
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_waiter_times_out_when_limit_is_taken(clock):
+    limiter = make_limiter(initial_limit=1, min_limit=1)
+    
+    async def scenario():
+        async with limiter.acquire("get_status"):
+            with pytest.raises(LimiterTimeoutError):
+                async with limiter.acquire("get_status", timeout=0.01):
+                    pass
+        return limiter.stats()
+    
+    stats = asyncio.run(scenario())
+    assert stats["in_flight"] == 0
+    assert stats["queue_depth"] == 0
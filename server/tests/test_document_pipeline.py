@@ -0,0 +1,37 @@
+from PIL import Image, PngImagePlugin
+
+from services.document_pipeline import write_clean_copy
+
+GPS_IFD = 0x8825
+ORIENTATION = 0x0112
+
+
+def test_clean_jpeg_drops_exif_but_keeps_orientation_and_pixels(tmp_path):
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6
+    exif[0x010F] = "Camera"
+    exif[GPS_IFD] = {1: "N", 2: (55.0, 45.0, 0.0)}
+    Image.new("RGB", (120, 80), (10, 200, 30)).save(tmp_path / "a.jpg", exif=exif.tobytes(), comment=b"note")
+    
+    write_clean_copy(str(tmp_path / "a.jpg"), str(tmp_path / "a.clean.jpg"), "image/jpeg", 6)
+    
+    with Image.open(tmp_path / "a.jpg") as original, Image.open(tmp_path / "a.clean.jpg") as clean:
+        assert dict(clean.getexif()) == {ORIENTATION: 6}
+        assert "comment" not in clean.info
+        assert list(clean.getdata()) == list(original.getdata())
+    assert b"Camera" not in (tmp_path / "a.clean.jpg").read_bytes()
+
+
+def test_clean_png_and_gif_drop_text(tmp_path):
+    info = PngImagePlugin.PngInfo()
+    info.add_text("Author", "someone")
+    Image.new("RGBA", (120, 80), (1, 2, 3, 4)).save(tmp_path / "b.png", pnginfo=info)
+    Image.new("P", (120, 80), 3).save(tmp_path / "c.gif", comment=b"someone", loop=0)
+    
+    write_clean_copy(str(tmp_path / "b.png"), str(tmp_path / "b.clean.png"), "image/png")
+    write_clean_copy(str(tmp_path / "c.gif"), str(tmp_path / "c.clean.gif"), "image/gif")
+    
+    with Image.open(tmp_path / "b.clean.png") as png, Image.open(tmp_path / "c.clean.gif") as gif:
+        assert png.text == {}
+        assert "comment" not in gif.info
+        assert gif.info["loop"] == 0
@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def alembic(database_path: str, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-m", "alembic", *args],
+        cwd=SERVER_DIR,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{database_path}"},
+        capture_output=True,
+        text=True
+    )
+
+
+def test_models_match_migrated_schema(tmp_path):
+    database_path = str(tmp_path / "check.db")
+    
+    upgrade = alembic(database_path, "upgrade", "head")
+    assert upgrade.returncode == 0, upgrade.stderr
+    
+    # Autogenerate would propose nothing, in particular not dropping the search tables
+    check = alembic(database_path, "check")
+    assert check.returncode == 0, check.stderr
@@ -0,0 +1,24 @@
+from email.utils import formatdate
+
+from services.rates_feed import build_rates_feed
+
+FEED = b"<rates><item><from>BTC</from><to>USDT</to></item></rates>"
+
+
+def test_not_modified_prefers_if_none_match():
+    feed = build_rates_feed(FEED)
+    later = formatdate(usegmt=True)
+    
+    assert feed.not_modified(feed.etag_for("gzip"), None)
+    assert not feed.not_modified('"other"', later)
+    assert feed.not_modified(None, later)
+
+
+def test_not_modified_since_compares_fetch_time():
+    feed = build_rates_feed(FEED)
+    fetched = feed.fetched_at
+    
+    assert feed.not_modified(None, fetched)
+    assert not feed.not_modified(None, "Mon, 01 Jan 2024 00:00:00 GMT")
+    assert not feed.not_modified(None, "not a date")
+    assert not feed.not_modified(None, None)
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Dict, List
+
+from services.status_broadcaster import StatusBroadcaster
+
+STATUSES = ["new", "pending", "processing", "completed"]
+
+
+class FakeClient:
+    """Every bid moves one status further on each check"""
+    
+    def __init__(self):
+        self.checks: Dict[str, int] = {}
+    
+    async def get_status(self, bid_id: str):
+        step = self.checks.get(bid_id, 0)
+        self.checks[bid_id] = step + 1
+        return {"success": True, "status": STATUSES[min(step, len(STATUSES) - 1)]}
+
+
+def test_slow_subscriber_gets_every_final_status():
+    client = FakeClient()
+    broadcaster = StatusBroadcaster(client, interval=0.001)
+    bid_ids = [f"bid-{index}" for index in range(40)]
+    
+    async def scenario() -> Dict[str, List[str]]:
+        received: Dict[str, List[str]] = {bid_id: [] for bid_id in bid_ids}
+        async with broadcaster.subscribe(bid_ids) as subscription:
+            # Read nothing until every watch has finished
+            while broadcaster.watched_bids():
+                await asyncio.sleep(0.01)
+            pending = set(bid_ids)
+            while pending:
+                bid_id, result = await asyncio.wait_for(subscription.get(), timeout=1)
+                received[bid_id].append(result["status"])
+                if result["status"] == "completed":
+                    pending.discard(bid_id)
+        await broadcaster.stop()
+        return received
+    
+    received = asyncio.run(scenario())
+    
+    # Intermediate states were coalesced, the final one arrived for every bid
+    assert all(statuses == ["completed"] for statuses in received.values())
+
+
+def test_subscriber_receives_changes_in_order():
+    client = FakeClient()
+    broadcaster = StatusBroadcaster(client, interval=0.001)
+    
+    async def scenario() -> List[str]:
+        statuses = []
+        async with broadcaster.subscribe(["bid-1"]) as subscription:
+            while not statuses or statuses[-1] != "completed":
+                _, result = await asyncio.wait_for(subscription.get(), timeout=1)
+                statuses.append(result["status"])
+        await broadcaster.stop()
+        return statuses
+    
+    statuses = asyncio.run(scenario())
+    
+    # Each status once and in order; one may be skipped if two land between reads
+    assert statuses == sorted(set(statuses), key=STATUSES.index)
+    assert statuses[-1] == "completed"
+    assert client.checks["bid-1"] == len(STATUSES)
@@ -23,6 +23,8 @@ function AdminPageContent() {
   const [verificationRequests, setVerificationRequests] = useState([]);
   const [allRequests, setAllRequests] = useState([]);
   const [users, setUsers] = useState([]);
+  const [usersCursor, setUsersCursor] = useState(null);
+  const [loadingUsers, setLoadingUsers] = useState(false);
   const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
   const [selectedRequest, setSelectedRequest] = useState(null);
@@ -65,7 +67,8 @@ function AdminPageContent() {
 
       setVerificationRequests(pendingRequests);
       setAllRequests(allRequestsData);
-      setUsers(usersData);
+      setUsers(usersData.users);
+      setUsersCursor(usersData.nextCursor);
       setStats(statsData);
     } catch (error) {
       console.error("Error loading admin data:", error);
@@ -80,6 +83,20 @@ function AdminPageContent() {
     }
   };
 
+  const loadMoreUsers = async () => {
+    try {
+      setLoadingUsers(true);
+      const page = await adminApi.getUsers({ cursor: usersCursor });
+      setUsers((prev) => [...prev, ...page.users]);
+      setUsersCursor(page.nextCursor);
+    } catch (error) {
+      console.error("Error loading users:", error);
+      toast.error("Ошибка загрузки пользователей");
+    } finally {
+      setLoadingUsers(false);
+    }
+  };
+
   const handleApproveRequest = (request) => {
     setSelectedRequest(request);
     setModalAction("approve");
@@ -238,7 +255,7 @@ function AdminPageContent() {
           className={`${s.tab} ${activeTab === "users" ? s.active : ""}`}
           onClick={() => setActiveTab("users")}
         >
-          Пользователи ({users.length})
+          Пользователи ({stats ? stats.total_users : users.length})
         </button>
       </div>
 
@@ -348,6 +365,15 @@ function AdminPageContent() {
                 </div>
               </div>
             ))}
+            {usersCursor && (
+              <button
+                className={s.loadMoreBtn}
+                onClick={loadMoreUsers}
+                disabled={loadingUsers}
+              >
+                {loadingUsers ? "Загрузка..." : "Показать ещё"}
+              </button>
+            )}
           </div>
         )}
       </div>
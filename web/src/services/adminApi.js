@@ -81,17 +81,29 @@ class AdminApi {
     return response.json();
   }
 
-  async getUsers() {
-    const response = await fetch(`${API_BASE_URL}/api/admin/users`, {
-      headers: this.getHeaders(),
-    });
+  // One page of users, newest first. Pass the returned nextCursor back to
+  // get the following page; it is null on the last one.
+  async getUsers({ cursor = "", limit = 100 } = {}) {
+    const params = new URLSearchParams();
+    if (cursor) params.append("cursor", cursor);
+    if (limit) params.append("limit", limit);
+
+    const response = await fetch(
+      `${API_BASE_URL}/api/admin/users?${params.toString()}`,
+      {
+        headers: this.getHeaders(),
+      }
+    );
 
     if (!response.ok) {
       const error = await response.json();
       throw new Error(error.detail || "Failed to fetch users");
     }
 
-    return response.json();
+    return {
+      users: await response.json(),
+      nextCursor: response.headers.get("X-Next-Cursor"),
+    };
   }
 
   async getStats() {